@@ -0,0 +1,60 @@
+import json
+import platform
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Benchmark suite reports, as written by either frontend's benchmark.py --output, and the
+# comparison of two of them that flags regressions.
+
+REGRESSION_THRESHOLD = 0.10
+NOISE_FLOOR_SECONDS = 0.001  # slowdowns smaller than this are treated as timer noise
+
+def time_case(case: Callable[[], object], repeat: int) -> float:
+    """Return the best wall-clock time of several runs of a case."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def suite_report(config: Dict, results: List[Dict]) -> Dict:
+    """Wrap suite results with the configuration and machine they were measured on."""
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'results': results
+    }
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """Match two suite reports by benchmark and size and flag cases that got slower than the threshold allows."""
+    baseline_seconds = {(result['benchmark'], result['rows']): result['seconds'] for result in baseline['results']}
+    comparisons = []
+    for result in current['results']:
+        before = baseline_seconds.get((result['benchmark'], result['rows']))
+        if before is None:
+            continue
+        ratio = result['seconds'] / before if before > 0 else float('inf')
+        comparisons.append({'benchmark': result['benchmark'], 'rows': result['rows'], 'baseline': before,
+                            'current': result['seconds'], 'ratio': ratio,
+                            'regression': ratio > 1 + threshold and result['seconds'] - before > NOISE_FLOOR_SECONDS})
+    return comparisons
+
+def compare_files(baseline_path: str, current_path: str, threshold: float = REGRESSION_THRESHOLD) -> int:
+    """Print how two saved suite reports compare; returns 1 if any benchmark regressed, else 0."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    with open(current_path) as file:
+        current = json.load(file)
+    comparisons = compare_results(baseline, current, threshold)
+    print(f"{'Benchmark':<48} {'Rows':>10} {'Baseline':>10} {'Current':>10} {'Ratio':>7}")
+    for comparison in comparisons:
+        flag = '  REGRESSION' if comparison['regression'] else ''
+        print(f"{comparison['benchmark']:<48} {comparison['rows']:>10} {comparison['baseline']:>10.4f} "
+              f"{comparison['current']:>10.4f} {comparison['ratio']:>7.2f}{flag}")
+    regressions = sum(comparison['regression'] for comparison in comparisons)
+    print(f"{regressions} of {len(comparisons)} benchmarks regressed by more than {threshold:.0%}")
+    return 1 if regressions else 0
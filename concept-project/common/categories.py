@@ -0,0 +1,56 @@
+import sys
+from typing import Dict, List, Optional
+
+def normalize_category(name: str) -> str:
+    """Reduce a category name to its lookup key, ignoring case and extra whitespace."""
+    return ' '.join(name.split()).casefold()
+
+class CategoryRegistry:
+    """Interns category names and gives each distinct category a small integer ID.
+
+    The first spelling seen (with whitespace collapsed) becomes the display name.
+    IDs are local to the process, so results crossing a process boundary use names.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._spellings: Dict[str, int] = {}  # exact spellings already seen, to skip normalizing them again
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Return the ID of a category, registering it if it is new."""
+        category_id = self._spellings.get(name)
+        if category_id is not None:
+            return category_id
+        key = normalize_category(name)
+        category_id = self._ids.get(key)
+        if category_id is None:
+            category_id = self._ids[key] = len(self.names)
+            self.names.append(sys.intern(' '.join(name.split())))
+        self._spellings[name] = category_id
+        return category_id
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Return the ID of a known category, or None without registering it."""
+        return self._ids.get(normalize_category(name))
+
+    def name(self, category_id: int) -> str:
+        return self.names[category_id]
+
+# Shared by every ledger in the process
+registry = CategoryRegistry()
+
+def intern_category(transaction: Dict) -> Dict:
+    """Replace a transaction's category with its canonical name and add its integer 'category_id'."""
+    category_id = registry.intern(transaction['category'])
+    transaction['category'] = registry.names[category_id]
+    transaction['category_id'] = category_id
+    return transaction
+
+def canonical_category(name: str) -> str:
+    """Return the registered spelling of a category, or the name unchanged if it has not been seen."""
+    category_id = registry.lookup(name)
+    return name if category_id is None else registry.names[category_id]
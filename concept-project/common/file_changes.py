@@ -0,0 +1,53 @@
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# A manifest maps the absolute path of every imported file to an entry recording its
+# size and mtime, the number of bytes imported so far and the SHA-256 of those bytes.
+
+def read_file_changes(file_path: str, entry: Optional[Dict]) -> Tuple[str, str, Dict]:
+    """Work out what is new in a file since its manifest entry was recorded.
+
+    Returns a status ('unchanged', 'appended', 'new' or 'rewritten'), the text still to parse
+    and the updated entry. For an appended CSV file the text is the header line plus only the new rows
+    that end in a newline.
+    """
+    stat = os.stat(file_path)
+    if entry is not None and stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+        return 'unchanged', '', entry
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        if entry is not None and stat.st_size >= entry['offset']:
+            _hash_prefix(hasher, file, entry['offset'])
+            if hasher.hexdigest() == entry['prefix_hash']:
+                tail = file.read()
+                if file_path.endswith('.csv'):
+                    # A row still being written is left, unhashed, for the next import to finish
+                    tail = tail[:tail.rfind(b'\n') + 1]
+                hasher.update(tail)
+                updated = _manifest_entry(file_path, stat, entry['offset'] + len(tail), hasher)
+                if not tail:
+                    return 'unchanged', '', updated
+                # Only CSV rows can be parsed on their own; other formats are read again in full
+                if file_path.endswith('.csv'):
+                    file.seek(0)
+                    return 'appended', (file.readline() + tail).decode('utf-8'), updated
+            file.seek(0)
+            hasher = hashlib.sha256()
+        data = file.read()
+    hasher.update(data)
+    return ('new' if entry is None else 'rewritten'), data.decode('utf-8'), _manifest_entry(file_path, stat, len(data), hasher)
+
+def _hash_prefix(hasher, file, length: int) -> None:
+    while length > 0:
+        block = file.read(min(HASH_BLOCK_SIZE, length))
+        if not block:
+            return
+        hasher.update(block)
+        length -= len(block)
+
+def _manifest_entry(file_path: str, stat: os.stat_result, offset: int, hasher) -> Dict:
+    return {'path': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'prefix_hash': hasher.hexdigest(), 'offset': offset}
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional
+
+# Opt-in instrumentation. While disabled, an instrumented call costs one flag check.
+_enabled = False
+_trace_memory = False
+_stats: Dict[str, Dict] = {}
+_lock = threading.Lock()
+_local = threading.local()  # per-thread stack of the highest traced memory seen inside each call in progress
+
+def enable(trace_memory: bool = False) -> None:
+    """Start recording stats, optionally tracking peak memory with tracemalloc (which slows calls down)."""
+    global _enabled, _trace_memory
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+def disable() -> None:
+    """Stop recording stats and memory tracing; stats recorded so far are kept."""
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def configure_from_environment() -> None:
+    """Enable instrumentation when FINANCE_INSTRUMENT is set; the value 'memory' also traces memory."""
+    setting = os.environ.get('FINANCE_INSTRUMENT', '')
+    if setting:
+        enable(trace_memory=setting == 'memory')
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+def stats() -> Dict[str, Dict]:
+    """Return a copy of the stats per instrumented name: calls, seconds, rows and peak_bytes."""
+    with _lock:
+        return {name: dict(record) for name, record in _stats.items()}
+
+def dump_stats(file_path: str) -> None:
+    """Write the current stats to a JSON file."""
+    with open(file_path, 'w') as file:
+        json.dump(stats(), file, indent=2)
+
+def format_stats(records: Dict[str, Dict]) -> str:
+    """Format stats as a table, slowest total time first."""
+    lines = [f"{'Name':<48} {'Calls':>8} {'Seconds':>10} {'Rows':>12} {'Peak KiB':>10}"]
+    for name, record in sorted(records.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        lines.append(f"{name:<48} {record['calls']:>8} {record['seconds']:>10.4f} {record['rows']:>12} {record['peak_bytes'] / 1024:>10.1f}")
+    return "\n".join(lines)
+
+@contextmanager
+def measure(name: str) -> Iterator[Dict]:
+    """Record one timed call under name. Set 'rows' on the yielded dict to count rows processed."""
+    call = {'rows': 0}
+    if not _enabled:
+        yield call
+        return
+    tracing = _trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        stack = _local.__dict__.setdefault('peaks', [])
+        start_memory, peak_so_far = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1] = max(stack[-1], peak_so_far)
+        tracemalloc.reset_peak()
+        stack.append(0)
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        seconds = time.perf_counter() - start
+        peak = 0
+        if tracing:
+            # Nested calls reset the tracemalloc peak, so combine it with what they passed up
+            peak = max(0, tracemalloc.get_traced_memory()[1], stack.pop() + start_memory) - start_memory
+            if stack:
+                stack[-1] = max(stack[-1], peak + start_memory)
+        _record(name, seconds, call['rows'], peak)
+
+def _record(name: str, seconds: float, rows: int, peak: int) -> None:
+    with _lock:
+        record = _stats.get(name)
+        if record is None:
+            record = _stats[name] = {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_bytes': 0}
+        record['calls'] += 1
+        record['seconds'] += seconds
+        record['rows'] += rows
+        record['peak_bytes'] = max(record['peak_bytes'], peak)
+
+def instrumented(name: Optional[str] = None, rows: Optional[Callable] = None) -> Callable:
+    """Decorate a function so its calls are measured while instrumentation is enabled.
+
+    rows, if given, is called as rows(result, *args, **kwargs) to count the rows the call processed.
+    """
+    def decorate(function: Callable) -> Callable:
+        label = name or f"{function.__module__}.{function.__qualname__}"
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with measure(label) as call:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    call['rows'] = rows(result, *args, **kwargs)
+                return result
+        return wrapper
+    return decorate
+
+def rows_returned(result, *args, **kwargs) -> int:
+    """Count the rows in a call's result."""
+    return len(result)
+
+def rows_in_argument(index: int) -> Callable:
+    """Make a rows counter for the positional argument at index, for arguments that have a length."""
+    def count(result, *args, **kwargs) -> int:
+        value = args[index] if index < len(args) else None
+        return len(value) if hasattr(value, '__len__') else 0
+    return count
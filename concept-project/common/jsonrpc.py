@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import instrument
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# JSON-RPC 2.0, one message per line, over TCP or a Unix socket. A line holding a list is a
+# batch and gets a list of responses back. Amounts in results are integer cents.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+APPLICATION_ERROR = -32000
+
+class RequestError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+class JsonRpcServer:
+    """Answer JSON-RPC requests from an asyncio event loop, leaving a frontend to say what its methods are.
+
+    Subclasses fill self.methods with name -> (function, kind), where kind is one of:
+      - 'inline': called on the loop;
+      - 'write': called on the loop to validate its params, returning (rows, result). Rows
+        queued by every write in a loop pass go to apply_writes together, once no reader is
+        running, and each writer is answered with its result;
+      - anything else: handed to dispatch, which runs the read off the loop inside reading().
+    Reads wait for writes queued before them, so a client sees its own writes, and queued
+    writes go before reads that have not started, so reads cannot starve them.
+    """
+
+    def __init__(self):
+        self.methods: Dict[str, Tuple[Callable, str]] = {}
+        self._pending_writes: List = []
+        self._flushed: Optional[asyncio.Future] = None
+        self._readers = 0
+        self._writer_waiting = False
+        self._state: Optional[asyncio.Condition] = None
+        self.requests_served = 0
+
+    def apply_writes(self, rows: List) -> None:
+        """Apply the rows of every write queued during one loop pass."""
+        raise NotImplementedError
+
+    async def dispatch(self, kind: str, function: Callable, args: List, kwargs: Dict) -> Any:
+        """Run a read of a kind this class doesn't handle itself."""
+        raise RequestError(INTERNAL_ERROR, f"Unknown method kind: {kind}")
+
+    # Scheduling
+
+    async def call(self, method: str, params: Any) -> Any:
+        entry = self.methods.get(method)
+        if entry is None:
+            raise RequestError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        function, kind = entry
+        if not isinstance(params, (list, dict)):
+            raise RequestError(INVALID_PARAMS, "params must be an array or an object")
+        args, kwargs = (params, {}) if isinstance(params, list) else ([], params)
+        if kind == 'write':
+            rows, result = function(*args, **kwargs)
+            await self._write(rows)
+            return result
+        # A failed write is reported to its writers, not to the reads behind it
+        if self._flushed is not None:
+            await asyncio.wait((self._flushed,))
+        if kind == 'inline':
+            return function(*args, **kwargs)
+        return await self.dispatch(kind, function, args, kwargs)
+
+    async def _write(self, rows: List) -> None:
+        self._pending_writes.extend(rows)
+        if self._flushed is None:
+            self._flushed = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush_writes(self._flushed))
+        await asyncio.shield(self._flushed)
+
+    async def _flush_writes(self, flushed: asyncio.Future) -> None:
+        """Apply every write queued during this loop pass at once, after reads in progress finish."""
+        await asyncio.sleep(0)
+        try:
+            async with self._state:
+                self._writer_waiting = True
+                try:
+                    await self._state.wait_for(lambda: self._readers == 0)
+                    rows, self._pending_writes, self._flushed = self._pending_writes, [], None
+                    self.apply_writes(rows)
+                finally:
+                    # Reads held back by this write must be woken even when it fails
+                    self._writer_waiting = False
+                    self._state.notify_all()
+            flushed.set_result(len(rows))
+        except Exception as e:
+            self._pending_writes, self._flushed = [], None
+            flushed.set_exception(e)
+
+    @asynccontextmanager
+    async def reading(self) -> AsyncIterator[None]:
+        """Count the body as a reader, so writes wait for it to finish; it first waits for queued writes."""
+        async with self._state:
+            await self._state.wait_for(lambda: not self._writer_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._state:
+                self._readers -= 1
+                self._state.notify_all()
+
+    # Protocol
+
+    async def handle_message(self, message: Any) -> Any:
+        """Answer one decoded request or batch; returns None when nothing needs sending back."""
+        if isinstance(message, list):
+            if not message:
+                return error_response(None, INVALID_REQUEST, "Empty batch")
+            responses = await asyncio.gather(*(self.handle_request(request) for request in message))
+            responses = [response for response in responses if response is not None]
+            return responses or None
+        return await self.handle_request(message)
+
+    async def handle_request(self, request: Any) -> Optional[Dict]:
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return error_response(request.get('id') if isinstance(request, dict) else None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get('id')
+        try:
+            with instrument.measure(f"server.{request['method']}"):
+                result = await self.call(request['method'], request.get('params', []))
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RequestError as e:
+            response = error_response(request_id, e.code, str(e))
+        except TypeError as e:
+            response = error_response(request_id, INVALID_PARAMS, str(e))
+        except (ValueError, KeyError) as e:
+            response = error_response(request_id, APPLICATION_ERROR, str(e))
+        except Exception as e:
+            logger.exception("event=request_failed method=%r", request['method'])
+            response = error_response(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        self.requests_served += 1
+        # Requests without an id are notifications and get no response
+        return response if 'id' in request else None
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read requests line by line and answer each as soon as it is done, so slow reports don't hold up quick ones."""
+        peer = writer.get_extra_info('peername') or 'unix socket'
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(encode(error_response(None, INVALID_REQUEST, "Message too large")))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            logger.debug("event=client_disconnected peer=%r", peer)
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = error_response(None, PARSE_ERROR, f"Parse error: {e}")
+        else:
+            response = await self.handle_message(message)
+        if response is not None and not writer.is_closing():
+            writer.write(encode(response))
+            await writer.drain()
+
+    async def start(self, host: str, port: int, unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Start listening and return the asyncio server."""
+        self._state = asyncio.Condition()
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=MAX_MESSAGE_BYTES)
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_MESSAGE_BYTES)
+
+def error_response(request_id: Any, code: int, message: str) -> Dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+def encode(response: Any) -> bytes:
+    return json.dumps(response, separators=(',', ':')).encode('utf-8') + b'\n'
@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+# Drive a running server with closed-loop clients: each connection sends a request, waits for
+# its answer and sends the next, for a fixed time. Reports requests per second and latency
+# percentiles, overall and per method. Either frontend's server can be the target: --port picks
+# it, and --mix names the methods to call, as weights or as one of MIXES.
+
+DEFAULT_PORT = 8765  # the imperative server's; the functional one listens on 8766
+MIXES = {
+    # Methods both servers answer
+    'shared': "add_transaction=4,count=2,spending_between=2,transactions_between=1,set_budget=1",
+    'functional': "add_transaction=4,count=2,spending_between=2,transactions_between=1,spending_summary=1,track_budget_usage=1",
+    'imperative': "add_transaction=4,generate_report=3,spending_between=2,transactions_between=1,track_budget=1",
+}
+DEFAULT_MIX = 'shared'
+CATEGORIES = ('Food', 'Transport', 'Utilities', 'Entertainment', 'Health', 'Rent')
+FIRST_DAY = date(2024, 1, 1)
+
+def parse_mix(text: str) -> Tuple[List[str], List[float]]:
+    """Turn 'method=weight,...', or the name of one of MIXES, into parallel lists of methods and weights."""
+    methods, weights = [], []
+    for item in MIXES.get(text, text).split(','):
+        method, _, weight = item.partition('=')
+        methods.append(method.strip())
+        weights.append(float(weight or 1))
+    return methods, weights
+
+def random_day(rng: random.Random, days: int = 365) -> str:
+    return (FIRST_DAY + timedelta(days=rng.randrange(days))).isoformat()
+
+def random_row(rng: random.Random) -> List:
+    return [round(rng.uniform(1, 200), 2), rng.choice(CATEGORIES), random_day(rng), rng.choice(('expense', 'expense', 'income'))]
+
+def request_params(method: str, rng: random.Random) -> Any:
+    """Make plausible parameters for a method."""
+    if method == 'add_transaction':
+        return random_row(rng)
+    if method == 'add_transactions':
+        return [[random_row(rng) for _ in range(50)]]
+    if method in ('transactions_between', 'spending_between'):
+        start = rng.randrange(330)
+        first = (FIRST_DAY + timedelta(days=start)).isoformat()
+        last = (FIRST_DAY + timedelta(days=start + 30)).isoformat()
+        # Positional, since the servers name these parameters differently
+        if method == 'transactions_between':
+            return [first, last, None, 100]
+        return [first, last]
+    if method == 'monthly_spending_trends':
+        return [2024, rng.randrange(1, 13)]
+    if method == 'compare_periods':
+        return ['month', [2024, 6], [2024, 5]]
+    if method == 'get_previous_month_category_spending':
+        return [rng.choice(CATEGORIES), rng.randrange(1, 13)]
+    if method == 'set_budget':
+        return [rng.choice(CATEGORIES), rng.randrange(100, 1000)]
+    return []
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Client:
+    """One connection sending a request or batch at a time and timing each round trip."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, rng: random.Random,
+                 methods: List[str], weights: List[float], batch: int):
+        self.reader = reader
+        self.writer = writer
+        self.rng = rng
+        self.methods = methods
+        self.weights = weights
+        self.batch = batch
+        self.ids = itertools.count(1)
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors = 0
+
+    def make_request(self) -> Tuple[str, Dict]:
+        method = self.rng.choices(self.methods, self.weights)[0]
+        return method, {'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': request_params(method, self.rng)}
+
+    async def run(self, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            requests = [self.make_request() for _ in range(self.batch)]
+            payload = [request for _, request in requests] if self.batch > 1 else requests[0][1]
+            started = time.perf_counter()
+            self.writer.write(json.dumps(payload, separators=(',', ':')).encode('utf-8') + b'\n')
+            await self.writer.drain()
+            line = await self.reader.readline()
+            elapsed = time.perf_counter() - started
+            if not line:
+                raise ConnectionError("server closed the connection")
+            responses = json.loads(line)
+            if not isinstance(responses, list):
+                responses = [responses]
+            self.errors += sum(1 for response in responses if 'error' in response)
+            # A batch is answered as a whole, so each of its requests is charged the batch's latency
+            for method, _ in requests:
+                self.latencies.setdefault(method, []).append(elapsed)
+
+async def open_connection(options: argparse.Namespace) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if options.unix:
+        return await asyncio.open_unix_connection(options.unix, limit=16 * 1024 * 1024)
+    return await asyncio.open_connection(options.host, options.port, limit=16 * 1024 * 1024)
+
+async def run_load(options: argparse.Namespace) -> Dict:
+    methods, weights = parse_mix(options.mix)
+    rng = random.Random(options.seed)
+    clients = []
+    for _ in range(options.connections):
+        reader, writer = await open_connection(options)
+        clients.append(Client(reader, writer, random.Random(rng.random()), methods, weights, options.batch))
+
+    if options.warmup > 0:
+        await asyncio.gather(*(client.run(time.perf_counter() + options.warmup) for client in clients))
+        for client in clients:
+            client.latencies, client.errors = {}, 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run(started + options.duration) for client in clients))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.writer.close()
+
+    by_method = {}
+    for client in clients:
+        for method, latencies in client.latencies.items():
+            by_method.setdefault(method, []).extend(latencies)
+    return summarise(by_method, sum(client.errors for client in clients), elapsed, options)
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'rps': len(ordered) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'max_ms': (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+def summarise(by_method: Dict[str, List[float]], errors: int, elapsed: float, options: argparse.Namespace) -> Dict:
+    overall = latency_summary([latency for latencies in by_method.values() for latency in latencies], elapsed)
+    overall.update({'errors': errors, 'seconds': elapsed, 'connections': options.connections, 'batch': options.batch})
+    return {'overall': overall, 'methods': {method: latency_summary(latencies, elapsed) for method, latencies in sorted(by_method.items())}}
+
+def print_summary(results: Dict) -> None:
+    overall = results['overall']
+    print(f"{overall['requests']} requests in {overall['seconds']:.1f}s over {overall['connections']} connections"
+          f" (batch {overall['batch']}), {overall['errors']} errors")
+    print(f"{'method':<38} {'requests':>9} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in [('all', overall)] + list(results['methods'].items()):
+        print(f"{name:<38} {row['requests']:>9} {row['rps']:>10.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure either frontend's JSON-RPC server's throughput and latency under load.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--connections', type=int, default=32, help="concurrent client connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to measure for")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds to run before measuring")
+    parser.add_argument('--batch', type=int, default=1, help="requests sent together as one JSON-RPC batch")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"weighted methods to call, as method=weight,... or one of {', '.join(MIXES)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results to a JSON file")
+    options = parser.parse_args()
+
+    results = asyncio.run(run_load(options))
+    print_summary(results)
+    if options.json:
+        with open(options.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Union
+
+def to_cents(amount: Union[int, float, str]) -> int:
+    """Convert an amount in currency units to integer cents, rounding half away from zero."""
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float) and abs(amount) < 1e12:
+        # Floats with at most two decimals, as JSON files hold, land within rounding error of a whole cent
+        cents = round(amount * 100)
+        if abs(amount * 100 - cents) < 1e-6:
+            return cents
+    text = amount.strip() if isinstance(amount, str) else repr(float(amount))
+    sign, digits = (-1, text[1:]) if text.startswith('-') else (1, text.lstrip('+'))
+    whole, _, fraction = digits.partition('.')
+    # Fast path for plain amounts such as "12", "12.3" or "12.34"
+    if whole.isdigit() and len(fraction) <= 2 and (not fraction or fraction.isdigit()):
+        return sign * (int(whole) * 100 + int(fraction.ljust(2, '0')))
+    try:
+        return int(Decimal(text).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {amount!r}") from None
+
+def from_cents(cents: int) -> float:
+    """Convert integer cents to currency units for file formats that store decimals."""
+    return cents / 100
+
+def format_cents(cents: int) -> str:
+    """Format integer cents for display, e.g. 123456 -> '1234.56'."""
+    sign = '-' if cents < 0 else ''
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{fraction:02d}"
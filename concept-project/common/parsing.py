@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, NamedTuple, Optional, TextIO, Tuple
+from money import to_cents
+
+# One ingestion path for every text file either frontend writes. The layout is sniffed from the
+# first characters and columns are mapped once per file, whatever their case:
+#   csv           header row, then one transaction per line
+#   json-array    [{"amount": ..., "category": ..., "date": ..., "type": ...}, ...]
+#   json-wrapped  {"transactions": [{"Amount": ..., "Category": ..., "Date": ..., "Type": ...}, ...]}
+#   jsonl         one JSON object per line
+# Each frontend passes the function building its own row from the four raw field values, and
+# the function recording a row that could not be built.
+
+FIELDS = ('amount', 'category', 'date', 'type')
+FIELD_ALIASES = {'transaction_type': 'type'}
+TYPES = ('income', 'expense')
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_ELEMENT_SIZE = 1024 * 1024  # characters; no transaction comes near this
+MAX_RECORD_TEXT = 200
+_WRAPPED_PREFIX = re.compile(r'\s*\{\s*"transactions"\s*:\s*(?=\[)', re.IGNORECASE)
+# A whole string (or one running off the end of the text) or a character that nests or separates JSON values
+_STRUCTURE = re.compile(r'"(?:[^"\\]+|\\.)*(?P<closed>")?|[\[\]{},]')
+
+# build(amount, category, date, type) returns a row or raises ValueError;
+# reject(number, record, error) is called instead for every record that fails
+Build = Callable[[Any, Any, Any, Any], Any]
+Reject = Callable[[int, Any, Exception], None]
+
+class MalformedElement(NamedTuple):
+    """An element of a JSON array that could not be decoded, standing in for it so the caller can record it."""
+    text: str
+    error: str
+
+@lru_cache(maxsize=1 << 16)
+def parse_date(text: str) -> date:
+    """Parse a YYYY-MM-DD date, memoized since a ledger repeats a few hundred dates across millions of rows.
+
+    date.fromisoformat is the fast path; unpadded dates such as 2024-1-5 fall back to strptime.
+    """
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        try:
+            return datetime.strptime(text.strip(), "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Invalid date: {text!r}") from None
+
+@lru_cache(maxsize=1 << 16)
+def canonical_date(text: str) -> str:
+    """Return a date in YYYY-MM-DD form, memoized like parse_date."""
+    return parse_date(text).isoformat()
+
+def validate_fields(amount: Any, category: Any, date_text: Any, kind: Any) -> Tuple[int, str, str, str]:
+    """Validate raw field values into (amount in cents, category, YYYY-MM-DD date, type), raising ValueError if invalid."""
+    if not isinstance(category, str) or not category.strip():
+        raise ValueError("missing category")
+    if kind not in TYPES:
+        kind = kind.strip().lower() if isinstance(kind, str) else kind
+        if kind not in TYPES:
+            raise ValueError(f"invalid type {kind!r}")
+    if not isinstance(date_text, str):
+        raise ValueError(f"invalid date {date_text!r}")
+    try:
+        cents = to_cents(amount)
+    except TypeError:
+        raise ValueError(f"Invalid amount: {amount!r}") from None
+    return cents, category, canonical_date(date_text), kind
+
+def sniff_schema(head: str) -> str:
+    """Guess a file's layout from its first characters: 'csv', 'json-array', 'json-wrapped' or 'jsonl'."""
+    text = head.lstrip()
+    if text.startswith('['):
+        return 'json-array'
+    if not text.startswith('{'):
+        return 'csv'
+    try:
+        first = json.loads(text.split('\n', 1)[0])
+    except json.JSONDecodeError:
+        return 'json-wrapped'  # an object spread over several lines
+    return 'json-wrapped' if any(key.lower() == 'transactions' for key in first) else 'jsonl'
+
+def column_map(keys: Iterable) -> Dict[str, Any]:
+    """Map each known field to the key (or, for a CSV header, the position) holding it, ignoring case."""
+    columns = {}
+    for position, key in enumerate(keys):
+        if not isinstance(key, str):
+            continue
+        name = key.strip().lower()
+        name = FIELD_ALIASES.get(name, name)
+        if name in FIELDS and name not in columns:
+            columns[name] = key if isinstance(keys, Mapping) else position
+    return columns
+
+def field_getter(columns: Mapping[str, Any]) -> Callable[[Any], Tuple]:
+    """Make a function pulling (amount, category, date, type) out of records laid out as columns describes."""
+    missing = [field for field in FIELDS if field not in columns]
+    if missing:
+        error = f"missing {', '.join(missing)}"
+
+        def fail(record):
+            raise ValueError(error)
+        return fail
+    return itemgetter(*(columns[field] for field in FIELDS))
+
+def parse_stream(file: TextIO, build: Build, reject: Reject, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[str, Iterator]:
+    """Sniff the layout of a text stream, returning it with an iterator over the rows build makes.
+
+    The first chunk is read straight away. Rows are numbered by line for CSV and JSON Lines and by
+    position for JSON arrays.
+    """
+    head = file.read(chunk_size)
+    if head.startswith('\ufeff'):
+        head = head[1:]  # byte order mark
+    text = head.lstrip()
+    if text.startswith('{') and '\n' not in text and not _WRAPPED_PREFIX.match(head):
+        # Telling JSON Lines from a wrapped object takes the whole first line
+        head += file.readline()
+    schema = sniff_schema(head)
+    return schema, _rows(file, head, schema, build, reject, chunk_size)
+
+def _rows(file: TextIO, head: str, schema: str, build: Build, reject: Reject, chunk_size: int) -> Iterator:
+    if schema == 'csv' or schema == 'jsonl':
+        # Finish the line the head cut off so every line reaches the reader whole
+        lines = chain(io.StringIO(head + file.readline()), file)
+        if schema == 'jsonl':
+            yield from _objects(_json_lines(lines, reject), build, reject)
+            return
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is not None:
+            yield from _records(((reader.line_num, row) for row in reader if row), column_map(header), build, reject)
+        return
+    if schema == 'json-wrapped':
+        prefix = _WRAPPED_PREFIX.match(head)
+        if prefix is not None:
+            values = iter_json_array(file, chunk_size, head[prefix.end():])
+        else:
+            document = json.loads(head + file.read())
+            values = next((value for key, value in document.items() if key.lower() == 'transactions'), [])
+    else:
+        values = iter_json_array(file, chunk_size, head)
+    yield from _objects(enumerate(values, 1), build, reject)
+
+def _records(records: Iterable[Tuple[int, Any]], columns: Mapping[str, Any], build: Build, reject: Reject) -> Iterator:
+    get_fields = field_getter(columns)
+    for number, record in records:
+        try:
+            yield build(*get_fields(record))
+        except (KeyError, IndexError):
+            reject(number, record, ValueError("missing fields"))
+        except ValueError as e:
+            reject(number, record, e)
+
+def _objects(records: Iterable[Tuple[int, Any]], build: Build, reject: Reject) -> Iterator:
+    """Build rows from numbered JSON values, mapping keys from the first object and again only for objects keyed differently."""
+    get_fields = None
+    for number, record in records:
+        if isinstance(record, MalformedElement):
+            reject(number, record.text, ValueError(record.error))
+            continue
+        if not isinstance(record, dict):
+            reject(number, record, ValueError("not an object"))
+            continue
+        if get_fields is None:
+            get_fields = field_getter(column_map(record))
+        try:
+            fields = get_fields(record)
+        except (KeyError, ValueError):
+            try:
+                fields = field_getter(column_map(record))(record)
+            except ValueError as e:
+                reject(number, record, e)
+                continue
+        try:
+            yield build(*fields)
+        except ValueError as e:
+            reject(number, record, e)
+
+def _json_lines(lines: Iterable[str], reject: Reject) -> Iterator[Tuple[int, Any]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            reject(number, line.rstrip('\r\n'), e)
+
+def iter_json_array(file: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE, buffer: str = '') -> Iterator:
+    """Incrementally decode the elements of a JSON array, starting with any text already read into buffer.
+
+    An element that is complete but not valid JSON is yielded as a MalformedElement and decoding
+    carries on with the next one.
+    """
+    decoder = json.JSONDecoder()
+    buffer = buffer or file.read(chunk_size)
+    index = 0
+    state = 'start'
+    while True:
+        while index < len(buffer) and buffer[index].isspace():
+            index += 1
+        if index == len(buffer):
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise json.JSONDecodeError("Unexpected end of JSON array", buffer, index)
+            buffer, index = chunk, 0
+            continue
+
+        char = buffer[index]
+        if state == 'start':
+            if char != '[':
+                raise json.JSONDecodeError("Expecting a JSON array", buffer, index)
+            index += 1
+            state = 'first'
+        elif char == ']' and state in ('first', 'separator'):
+            return
+        elif state == 'separator':
+            if char != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, index)
+            index += 1
+            state = 'value'
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError as e:
+                # Reading more can only help an element the buffer cuts off; one that ends in the
+                # buffer is malformed, and is skipped up to the ',' or ']' after it.
+                end = _element_end(buffer, index)
+                if end is not None:
+                    value = MalformedElement(buffer[index:end].rstrip()[:MAX_RECORD_TEXT], e.msg)
+            # A value that touches the end of the buffer, such as a number, may go on in the next chunk.
+            if end is None or end == len(buffer):
+                if len(buffer) - index > MAX_ELEMENT_SIZE:
+                    raise json.JSONDecodeError("JSON array element too long", buffer, index)
+                chunk = file.read(chunk_size)
+                if chunk:
+                    buffer, index = buffer[index:] + chunk, 0
+                    continue
+                if end is None:
+                    raise json.JSONDecodeError("Unterminated JSON array element", buffer, index)
+            yield value
+            index = end
+            state = 'separator'
+
+def _element_end(buffer: str, index: int) -> Optional[int]:
+    """Return where the array element starting at index ends, or None if the buffer ends inside it."""
+    depth = 0
+    for match in _STRUCTURE.finditer(buffer, index):
+        token = match.group()
+        if token[0] == '"':
+            if match.group('closed') is None:
+                return None
+        elif token in '[{':
+            depth += 1
+        elif token in ']}':
+            if depth == 0 and token == ']':
+                return match.start()
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            return match.start()
+    return None
@@ -0,0 +1,114 @@
+import csv
+import gzip
+import io
+import json
+import lzma
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+from money import format_cents, from_cents
+
+# Both frontends export through here. Each passes a function pulling (amount in cents, category,
+# date, type) out of one of its transactions, and may name the columns and wrap JSON arrays in
+# an object; every export has just those four columns, whatever else a transaction carries.
+EXPORT_FIELDS = ('amount', 'category', 'date', 'type')
+BUFFER_SIZE = 1024 * 1024
+CHUNK_ROWS = 10_000
+COMPRESSORS = {'.gz': gzip.open, '.xz': lzma.open}
+TEXT_FORMATS = ('.csv', '.json', '.jsonl')
+
+def split_compression(file_path: str) -> Tuple[str, str]:
+    """Split a path into the name of the uncompressed file and its compression suffix ('' if none)."""
+    for suffix in COMPRESSORS:
+        if file_path.endswith(suffix):
+            return file_path[:-len(suffix)], suffix
+    return file_path, ''
+
+def text_format(file_path: str) -> str:
+    """Return the text format suffix of a possibly compressed file, e.g. '.csv' for 'ledger.csv.gz'."""
+    base, _ = split_compression(file_path)
+    return next((suffix for suffix in TEXT_FORMATS if base.endswith(suffix)), '')
+
+def open_text(file_path: str, mode: str = 'r') -> TextIO:
+    """Open a UTF-8 text file with a large buffer, (de)compressing .gz and .xz files on the fly."""
+    _, suffix = split_compression(file_path)
+    if suffix:
+        return COMPRESSORS[suffix](file_path, mode + 't', encoding='utf-8', newline='')
+    return open(file_path, mode, buffering=BUFFER_SIZE, encoding='utf-8', newline='')
+
+def _chunks(transactions: Iterable[Any], size: int = CHUNK_ROWS) -> Iterator[List[Any]]:
+    iterator = iter(transactions)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+# fields(transaction) returns (amount in cents, category, date, type)
+Fields = Callable[[Any], Tuple[int, str, str, str]]
+
+def write_csv(file: TextIO, transactions: Iterable[Any], fields: Fields, columns: Sequence[str],
+              json_key: Optional[str], progress: Callable[[int], None]) -> None:
+    """Write transactions as CSV, one chunk of rows per write."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(transactions):
+        writer.writerows((format_cents(amount), category, date, kind) for amount, category, date, kind in map(fields, chunk))
+        file.write(buffer.getvalue())
+        buffer.seek(0)
+        buffer.truncate()
+        progress(len(chunk))
+    file.write(buffer.getvalue())  # the header of an empty ledger
+
+def _json_encoder(fields: Fields, columns: Sequence[str]) -> Callable[[Any], str]:
+    amount_key, category_key, date_key, type_key = columns
+
+    def encode(transaction: Any) -> str:
+        amount, category, date, kind = fields(transaction)
+        return json.dumps({amount_key: from_cents(amount), category_key: category, date_key: date, type_key: kind},
+                          separators=(',', ':'))
+    return encode
+
+def write_json(file: TextIO, transactions: Iterable[Any], fields: Fields, columns: Sequence[str],
+               json_key: Optional[str], progress: Callable[[int], None]) -> None:
+    """Write transactions as a compact JSON array, or an object holding one under json_key, one chunk of records per write."""
+    encode = _json_encoder(fields, columns)
+    opening, closing = ('[', ']') if json_key is None else ('{' + json.dumps(json_key) + ':[', ']}')
+    first = True
+    file.write(opening)
+    for chunk in _chunks(transactions):
+        file.write(('\n' if first else ',\n') + ',\n'.join(map(encode, chunk)))
+        first = False
+        progress(len(chunk))
+    file.write((closing if first else '\n' + closing) + '\n')
+
+def write_jsonl(file: TextIO, transactions: Iterable[Any], fields: Fields, columns: Sequence[str],
+                json_key: Optional[str], progress: Callable[[int], None]) -> None:
+    """Write transactions as JSON Lines, one compact record per line."""
+    encode = _json_encoder(fields, columns)
+    for chunk in _chunks(transactions):
+        file.write('\n'.join(map(encode, chunk)) + '\n')
+        progress(len(chunk))
+
+WRITERS = {'.csv': write_csv, '.json': write_json, '.jsonl': write_jsonl}
+
+def export_stream(file_path: str, transactions: Iterable[Any], fields: Fields, columns: Sequence[str] = EXPORT_FIELDS,
+                  json_key: Optional[str] = None, progress: Optional[Callable[[int], None]] = None) -> int:
+    """Stream transactions to a CSV, JSON or JSON Lines file, compressed if the name ends in .gz or .xz.
+
+    Rows are pulled from the iterable a chunk at a time, so the ledger is never copied, and progress,
+    if given, is called with the size of each chunk written. Returns the number of rows written.
+    """
+    writer = WRITERS.get(text_format(file_path))
+    if writer is None:
+        raise ValueError("Unsupported file type. Please use CSV, JSON or JSONL, optionally with .gz or .xz.")
+    written = [0]
+
+    def count(rows: int) -> None:
+        written[0] += rows
+        if progress is not None:
+            progress(rows)
+
+    with open_text(file_path, 'w') as file:
+        writer(file, transactions, fields, columns, json_key, count)
+    return written[0]
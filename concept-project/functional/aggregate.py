@@ -0,0 +1,40 @@
+from functools import reduce
+from typing import Dict, Iterable
+import common_path
+from categories import registry
+
+def empty_aggregate() -> Dict:
+    """Create the starting value for a transaction fold."""
+    return {'by_category': {}, 'expense': 0, 'income': 0, 'count': 0}
+
+def fold_transaction(aggregate: Dict, transaction: Dict) -> Dict:
+    """Fold a single transaction into a running aggregate, grouping expenses by category ID."""
+    amount = transaction['amount']
+    if transaction['type'] == 'expense':
+        by_category = aggregate['by_category']
+        category_id = transaction['category_id']
+        by_category[category_id] = by_category.get(category_id, 0) + amount
+        aggregate['expense'] += amount
+    elif transaction['type'] == 'income':
+        aggregate['income'] += amount
+    aggregate['count'] += 1
+    return aggregate
+
+def aggregate_transactions(transactions: Iterable[Dict]) -> Dict:
+    """Compute category totals and income/expense splits in a single pass."""
+    aggregate = reduce(fold_transaction, transactions, empty_aggregate())
+    # Category IDs are local to this process, so hand back names that can be merged across workers
+    aggregate['by_category'] = {registry.names[category_id]: amount for category_id, amount in aggregate['by_category'].items()}
+    return aggregate
+
+def merge_aggregates(left: Dict, right: Dict) -> Dict:
+    """Combine two partial aggregates into a new one, as if their transactions had been folded together."""
+    by_category = dict(left['by_category'])
+    for category, amount in right['by_category'].items():
+        by_category[category] = by_category.get(category, 0) + amount
+    return {
+        'by_category': by_category,
+        'expense': left['expense'] + right['expense'],
+        'income': left['income'] + right['income'],
+        'count': left['count'] + right['count']
+    }
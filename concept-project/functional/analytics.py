@@ -1,68 +1,71 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Optional, Tuple
+from parallel import run_aggregation
+from rollup import compare_periods
+import common_path
+from money import format_cents
+from date_index import month_bounds, previous_month, transactions_between
+from instrument import instrumented, rows_in_argument
 
-def spending_summary(transactions: List[Dict]) -> Dict[str, float]:
+@instrumented(rows=rows_in_argument(0))
+def spending_summary(transactions: Iterable[Dict], workers: int = 1) -> Dict[str, int]:
     """Generate a spending summary by category."""
-    def summarize(transactions, summary):
-        if not transactions:
-            return summary
-        transaction = transactions[0]
-        if transaction['type'] == 'expense':
-            category = transaction['category']
-            summary[category] = summary.get(category, 0) + transaction['amount']
-        return summarize(transactions[1:], summary)
-    
-    return summarize(transactions, {})
+    return run_aggregation(transactions, workers)['by_category']
 
-def overall_spending(transactions: List[Dict]) -> float:
+@instrumented(rows=rows_in_argument(0))
+def overall_spending(transactions: Iterable[Dict], workers: int = 1) -> int:
     """Calculate total spending (only expenses)."""
-    def sum_spending(transactions):
-        if not transactions:
-            return 0
-        if transactions[0]['type'] == 'expense':
-            return transactions[0]['amount'] + sum_spending(transactions[1:])
-        else:
-            return sum_spending(transactions[1:])
-    
-    return sum_spending(transactions)
+    return run_aggregation(transactions, workers)['expense']
 
-def spending_trends(transactions: List[Dict], previous_month: List[Dict]) -> Dict[str, float]:
+@instrumented(rows=rows_in_argument(0))
+def spending_trends(transactions: Iterable[Dict], previous_month: Iterable[Dict]) -> Dict[str, int]:
     """Compare spending trends between the current and previous month."""
     current_summary = spending_summary(transactions)
     previous_summary = spending_summary(previous_month)
-    
-    def calculate_trends(categories, trends):
-        if not categories:
-            return trends
-        category = categories[0]
-        trends[category] = current_summary.get(category, 0) - previous_summary.get(category, 0)
-        return calculate_trends(categories[1:], trends)
-    
-    return calculate_trends(list(current_summary.keys()), {})
+    return {category: amount - previous_summary.get(category, 0) for category, amount in current_summary.items()}
 
-def spending_insights(trends: Dict[str, float], current_summary: Dict[str, float]) -> List[str]:
+@instrumented()
+def spending_between(index: Dict, start: str, end: str, category: Optional[str] = None) -> Dict[str, int]:
+    """Generate a spending summary by category for a date range of a date index."""
+    return spending_summary(transactions_between(index, start, end, category))
+
+@instrumented()
+def monthly_spending_trends(index: Dict, year: int, month: int) -> Dict[str, int]:
+    """Compare spending trends between a month and the month before it, reading only those two months."""
+    return monthly_spending_report(index, year, month)[0]
+
+@instrumented()
+def monthly_spending_report(index: Dict, year: int, month: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Get a month's spending trends against the month before and its own spending summary, summarising each month once."""
+    current_summary = spending_summary(transactions_between(index, *month_bounds(year, month)))
+    previous_summary = spending_summary(transactions_between(index, *month_bounds(*previous_month(year, month))))
+    trends = {category: amount - previous_summary.get(category, 0) for category, amount in current_summary.items()}
+    return trends, current_summary
+
+@instrumented()
+def period_spending_trends(rollup: Dict, granularity: str, current: Tuple[int, ...], previous: Tuple[int, ...]) -> Dict[str, int]:
+    """Compare spending trends between any two periods of a rollup index."""
+    return compare_periods(rollup, granularity, current, previous)
+
+@instrumented()
+def spending_insights(trends: Dict[str, int], current_summary: Dict[str, int]) -> List[str]:
     """Provide insights into spending trends."""
-    def generate_insights(categories, insights):
-        if not categories:
-            return insights
-        category = categories[0]
+    def generate_insight(category):
         change = trends[category]
         current_amount = current_summary.get(category, 0)
         
         if current_amount == 0 and change == 0:
-            insights.append(f"No change in spending for {category}.")
+            return f"No change in spending for {category}."
         elif current_amount == 0:
-            insights.append(f"New spending on {category}: ${change:.2f}.")
+            return f"New spending on {category}: ${format_cents(change)}."
+        elif current_amount - change != 0:
+            if change > 0:
+                percentage_increase = (change / (current_amount - change)) * 100
+                return f"You spent {percentage_increase:.2f}% more on {category} this month."
+            elif change < 0:
+                percentage_decrease = (abs(change) / (current_amount + change)) * 100
+                return f"You spent {percentage_decrease:.2f}% less on {category} this month."
+            return None
         else:
-            if current_amount - change != 0:
-                if change > 0:
-                    percentage_increase = (change / (current_amount - change)) * 100
-                    insights.append(f"You spent {percentage_increase:.2f}% more on {category} this month.")
-                elif change < 0:
-                    percentage_decrease = (abs(change) / (current_amount + change)) * 100
-                    insights.append(f"You spent {percentage_decrease:.2f}% less on {category} this month.")
-            else:
-                insights.append(f"Spending on {category} is unchanged, cannot calculate percentage.")
-        
-        return generate_insights(categories[1:], insights)
+            return f"Spending on {category} is unchanged, cannot calculate percentage."
     
-    return generate_insights(list(trends.keys()), [])
+    return [insight for insight in map(generate_insight, trends) if insight is not None]
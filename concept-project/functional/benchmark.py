@@ -0,0 +1,250 @@
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date as Date
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+from aggregate import aggregate_transactions
+import common_path
+from benchmark_report import REGRESSION_THRESHOLD, compare_files, suite_report, time_case
+from parallel import aggregate_parallel
+from categories import intern_category
+from money import format_cents
+from persistent import PersistentVector
+from analytics import (monthly_spending_trends, overall_spending, period_spending_trends, spending_between, spending_insights,
+                       spending_summary, spending_trends)
+from budget import (budget_alert, evaluate_budget_alerts, format_budget_alert, set_budget, track_budget_usage,
+                    track_grouped_budget_usage)
+from rollup import build_rollup
+from date_index import build_date_index, month_bounds, transactions_between
+from transaction import (export_transactions_to_binary, export_transactions_to_csv, export_transactions_to_json,
+                         import_transactions, import_transactions_from_binary, iter_transaction_batches,
+                         iter_transactions, load_binary_frame, parse_transaction, record_transaction)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+CATEGORIES = ['Food', 'Rent', 'Utilities', 'Transport', 'Entertainment', 'Health', 'Salary']
+
+def synthetic_transactions(rows: int) -> Iterator[Dict]:
+    """Yield a deterministic stream of synthetic transactions."""
+    for i in range(rows):
+        yield intern_category({
+            'amount': (i % 500) * 100 + 25,
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'date': f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            'type': 'income' if i % 10 == 0 else 'expense'
+        })
+
+def synthetic_ledger(rows: int, categories: int = len(CATEGORIES), start: str = '2024-01-01', days: int = 365,
+                     income_ratio: float = 0.1, seed: int = 0) -> Iterator[Dict]:
+    """Yield a reproducible, realistic-looking ledger.
+
+    Categories are drawn with a skewed distribution, dates uniformly from the span,
+    and expenses are mostly small with a long tail while incomes are larger.
+    """
+    generator = random.Random(seed)
+    names = (CATEGORIES + [f"Category {n}" for n in range(len(CATEGORIES), categories)])[:categories]
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    first_day = Date.fromisoformat(start).toordinal()
+    for _ in range(rows):
+        is_income = generator.random() < income_ratio
+        amount = generator.lognormvariate(11, 0.5) if is_income else generator.lognormvariate(7.5, 1.2)
+        yield intern_category({
+            'amount': max(1, int(amount)),
+            'category': generator.choices(names, weights)[0],
+            'date': Date.fromordinal(first_day + generator.randrange(days)).isoformat(),
+            'type': 'income' if is_income else 'expense'
+        })
+
+def benchmark_aggregate(sizes: List[int]) -> List[Dict]:
+    """Time the single-pass aggregation for each ledger size."""
+    results = []
+    for rows in sizes:
+        start = time.perf_counter()
+        aggregate_transactions(synthetic_transactions(rows))
+        elapsed = time.perf_counter() - start
+        results.append({'rows': rows, 'seconds': elapsed, 'ns_per_row': elapsed / rows * 1e9})
+    return results
+
+def benchmark_parallel(rows: int, worker_counts: List[int]) -> List[Dict]:
+    """Time chunked parallel aggregation of one ledger for each worker count."""
+    transactions = list(synthetic_transactions(rows))
+    start = time.perf_counter()
+    serial = aggregate_transactions(transactions)
+    serial_seconds = time.perf_counter() - start
+    results = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        parallel = aggregate_parallel(transactions, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        results.append({'workers': workers, 'seconds': elapsed, 'speedup': serial_seconds / elapsed, 'identical': parallel == serial})
+    return results
+
+def benchmark_money(rows: int) -> List[Dict]:
+    """Compare per-category aggregation throughput with float, Decimal and integer-cent amounts."""
+    transactions = list(synthetic_transactions(rows))
+    representations = [
+        ('float', [(t['category'], t['amount'] / 100) for t in transactions]),
+        ('Decimal', [(t['category'], Decimal(t['amount']).scaleb(-2)) for t in transactions]),
+        ('int cents', [(t['category'], t['amount']) for t in transactions])
+    ]
+    results = []
+    for name, rows_by_category in representations:
+        totals = {}
+        start = time.perf_counter()
+        for category, amount in rows_by_category:
+            totals[category] = totals.get(category, 0) + amount
+        elapsed = time.perf_counter() - start
+        results.append({'representation': name, 'seconds': elapsed, 'rows_per_second': rows / elapsed, 'total': sum(totals.values())})
+    return results
+
+def suite_cases(ledger: List[Dict], directory: str) -> Dict[str, Callable[[], object]]:
+    """Build the named benchmark cases for one ledger, in the order they must run.
+
+    Export cases write the files that the import cases read back.
+    """
+    categories = sorted({transaction['category'] for transaction in ledger})
+    budgets = {}
+    for category in categories:
+        budgets = set_budget(budgets, category, 1000)
+    usage = track_budget_usage(budgets, ledger)
+    alerts = evaluate_budget_alerts(budgets, usage)
+    months = sorted({transaction['date'][:7] for transaction in ledger})
+    current_month, previous_month = months[-1], months[-2] if len(months) > 1 else months[-1]
+    current = [transaction for transaction in ledger if transaction['date'].startswith(current_month)]
+    previous = [transaction for transaction in ledger if transaction['date'].startswith(previous_month)]
+    rollup = build_rollup(ledger)
+    index = build_date_index(ledger)
+    current_bounds = month_bounds(*(int(part) for part in current_month.split('-')))
+    current_period, previous_period = (tuple(int(part) for part in month.split('-')) for month in (current_month, previous_month))
+    trends = spending_trends(current, previous)
+    summary = spending_summary(current)
+    raw_rows = [{**transaction, 'amount': format_cents(transaction['amount'])} for transaction in ledger]
+    for row in raw_rows:
+        del row['category_id']
+    paths = {extension: os.path.join(directory, f"ledger.{extension}") for extension in ('csv', 'json', 'ledger')}
+
+    vector = PersistentVector(ledger)
+
+    def record_many():
+        recorded = vector
+        for transaction in islice(ledger, 1000):
+            recorded = record_transaction(recorded, transaction['amount'] / 100, transaction['category'], transaction['date'], transaction['type'])
+        return recorded
+
+    cases = {
+        'analytics.spending_summary': lambda: spending_summary(ledger),
+        'analytics.overall_spending': lambda: overall_spending(ledger),
+        'analytics.spending_trends': lambda: spending_trends(current, previous),
+        'analytics.period_spending_trends': lambda: period_spending_trends(rollup, 'month', current_period, previous_period),
+        'analytics.spending_insights': lambda: spending_insights(trends, summary),
+        'analytics.spending_between': lambda: spending_between(index, *current_bounds),
+        'analytics.monthly_spending_trends': lambda: monthly_spending_trends(index, *current_period),
+        'date_index.build_date_index': lambda: build_date_index(ledger),
+        'date_index.transactions_between': lambda: transactions_between(index, *current_bounds, categories[0]),
+        'budget.set_budget': lambda: [set_budget(budgets, category, 500) for category in categories],
+        'budget.track_budget_usage': lambda: track_budget_usage(budgets, ledger),
+        'budget.track_grouped_budget_usage': lambda: track_grouped_budget_usage(budgets, ledger),
+        'budget.evaluate_budget_alerts': lambda: evaluate_budget_alerts(budgets, usage),
+        'budget.format_budget_alert': lambda: [format_budget_alert(alert) for alert in alerts],
+        'budget.budget_alert': lambda: budget_alert(budgets, usage),
+        'transaction.record_transaction': record_many,
+        'transaction.parse_transaction': lambda: [parse_transaction(dict(row)) for row in raw_rows],
+        'transaction.export_transactions_to_csv': lambda: export_transactions_to_csv(paths['csv'], ledger),
+        'transaction.export_transactions_to_json': lambda: export_transactions_to_json(paths['json'], ledger),
+        'transaction.import_transactions.csv': lambda: import_transactions(paths['csv']),
+        'transaction.import_transactions.json': lambda: import_transactions(paths['json']),
+        'transaction.iter_transactions': lambda: sum(1 for _ in iter_transactions(paths['csv'])),
+        'transaction.iter_transaction_batches': lambda: sum(1 for _ in iter_transaction_batches(paths['csv'], 10000))
+    }
+    # The binary ledger needs NumPy, which is optional
+    if importlib.util.find_spec('numpy') is not None:
+        cases.update({
+            'transaction.export_transactions_to_binary': lambda: export_transactions_to_binary(paths['ledger'], ledger),
+            'transaction.load_binary_frame': lambda: load_binary_frame(paths['ledger']),
+            'transaction.import_transactions_from_binary': lambda: import_transactions_from_binary(paths['ledger'])
+        })
+    return cases
+
+def run_suite(sizes: List[int], categories: int = len(CATEGORIES), days: int = 365, income_ratio: float = 0.1,
+              seed: int = 0, repeat: Optional[int] = None, cases: Optional[List[str]] = None) -> Dict:
+    """Time every benchmark case at every ledger size and return a JSON-serialisable report."""
+    results = []
+    for rows in sizes:
+        ledger = list(synthetic_ledger(rows, categories, days=days, income_ratio=income_ratio, seed=seed))
+        # Small ledgers are timed several times to smooth out noise
+        runs = repeat or max(1, min(5, 100_000 // rows))
+        with tempfile.TemporaryDirectory() as directory:
+            for name, case in suite_cases(ledger, directory).items():
+                if cases and not any(name.startswith(prefix) for prefix in cases):
+                    continue
+                seconds = time_case(case, runs)
+                results.append({'benchmark': name, 'rows': rows, 'seconds': seconds, 'ns_per_row': seconds / rows * 1e9})
+                print(f"{name:<48} {rows:>10} {seconds:>10.4f}s", file=sys.stderr)
+    config = {'sizes': sizes, 'categories': categories, 'days': days, 'income_ratio': income_ratio, 'seed': seed, 'repeat': repeat}
+    return suite_report(config, results)
+
+def main_suite(args: List[str]):
+    parser = argparse.ArgumentParser(prog='benchmark.py --suite', description="Time the public analytics, budget and transaction functions.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--categories', type=int, default=len(CATEGORIES))
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--income-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int)
+    parser.add_argument('--only', nargs='+', help="run only cases whose names start with these prefixes")
+    parser.add_argument('--output', default='benchmark_results.json')
+    options = parser.parse_args(args)
+    report = run_suite(options.sizes, options.categories, options.days, options.income_ratio, options.seed, options.repeat, options.only)
+    with open(options.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {len(report['results'])} results to {options.output}")
+
+def main_compare(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog='benchmark.py --compare', description="Compare two suite reports.")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    options = parser.parse_args(args)
+    return compare_files(options.baseline, options.current, options.threshold)
+
+def main_money(rows: int):
+    print(f"Money aggregation of {rows} rows")
+    print(f"{'Representation':>15} {'Seconds':>10} {'Rows/s':>14} {'Total':>22}")
+    for result in benchmark_money(rows):
+        print(f"{result['representation']:>15} {result['seconds']:>10.3f} {result['rows_per_second']:>14.0f} {str(result['total']):>22}")
+
+def main_parallel(rows: int):
+    worker_counts = list(range(1, (os.cpu_count() or 1) + 1))
+    print(f"Parallel aggregation of {rows} rows")
+    print(f"{'Workers':>8} {'Seconds':>10} {'Speedup':>8} {'Identical':>10}")
+    for result in benchmark_parallel(rows, worker_counts):
+        print(f"{result['workers']:>8} {result['seconds']:>10.3f} {result['speedup']:>8.2f} {str(result['identical']):>10}")
+
+def main():
+    if sys.argv[1:2] == ['--suite']:
+        main_suite(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['--compare']:
+        sys.exit(main_compare(sys.argv[2:]))
+    if sys.argv[1:2] == ['--parallel']:
+        main_parallel(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+        return
+    if sys.argv[1:2] == ['--money']:
+        main_money(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+        return
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    results = benchmark_aggregate(sizes)
+    print(f"{'Rows':>12} {'Seconds':>10} {'ns/row':>10}")
+    for result in results:
+        print(f"{result['rows']:>12} {result['seconds']:>10.3f} {result['ns_per_row']:>10.1f}")
+    # Linear scaling keeps the per-row cost flat as the ledger grows.
+    print(f"Per-row cost ratio (largest/smallest): {results[-1]['ns_per_row'] / results[0]['ns_per_row']:.2f}")
+
+if __name__ == "__main__":
+    main()
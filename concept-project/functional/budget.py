@@ -1,33 +1,58 @@
-from typing import Dict, List
+from operator import itemgetter
+from typing import Callable, Dict, Hashable, List, Iterable, Mapping
+from parallel import run_aggregation
+from persistent import PersistentMap
+import common_path
+from money import to_cents, format_cents
+from categories import canonical_category, registry
+from instrument import instrumented, rows_in_argument
 
-def set_budget(budgets: Dict[str, float], category: str, amount: float) -> Dict[str, float]:
-    """Set a budget for a specific category."""
-    new_budgets = budgets.copy()
-    new_budgets[category] = amount
-    return new_budgets
+def set_budget(budgets: Mapping[str, int], category: str, amount: float) -> PersistentMap:
+    """Set a budget for a specific category, stored in integer cents under its canonical name."""
+    budget_map = budgets if isinstance(budgets, PersistentMap) else PersistentMap(budgets)
+    return budget_map.set(registry.names[registry.intern(category)], to_cents(amount))
 
-def track_budget_usage(budgets: Dict[str, float], transactions: List[Dict]) -> Dict[str, float]:
+@instrumented(rows=rows_in_argument(1))
+def track_budget_usage(budgets: Dict[str, int], transactions: Iterable[Dict], workers: int = 1) -> Dict[str, int]:
     """Track the spending for each category against the budget."""
-    def calculate_usage(categories, usage):
-        if not categories:
-            return usage
-        category = categories[0]
-        usage[category] = sum(transaction['amount'] for transaction in transactions if transaction['category'] == category and transaction['type'] == 'expense')
-        return calculate_usage(categories[1:], usage)
-
-    return calculate_usage(list(budgets.keys()), {})
+    spending = run_aggregation(transactions, workers)['by_category']
+    return {category: spending.get(canonical_category(category), 0) for category in budgets}
     
-def budget_alert(budgets: Dict[str, float], usage: Dict[str, float]) -> List[str]:
-    """Generate alerts when the budget for a category is exceeded or close to it."""
-    def generate_alerts(categories, alerts):
-        if not categories:
-            return alerts
-        category = categories[0]
-        used = usage[category]
-        if used > budgets.get(category, 0):
-            alerts.append(f"Budget exceeded for {category}. Used: ${used}, Budget: ${budgets[category]}")
-        elif used > 0.9 * budgets.get(category, 0):
-            alerts.append(f"Warning: You are close to exceeding the budget for {category}. Used: ${used}, Budget: ${budgets[category]}")
-        return generate_alerts(categories[1:], alerts)
+@instrumented(rows=rows_in_argument(1))
+def track_grouped_budget_usage(budgets: Mapping[Hashable, int], transactions: Iterable[Dict],
+                               key: Callable[[Dict], Hashable] = itemgetter('category_id'),
+                               budget_group: Callable[[Hashable], Hashable] = registry.lookup) -> Dict[Hashable, int]:
+    """Track spending against budgets keyed by any grouping of transactions, e.g. (user, category).
+
+    key gives a transaction's group and budget_group the group a budget's key stands for. Both
+    default to category IDs, so a budget for 'food' counts spending filed under 'Food'.
+    """
+    spending = {}
+    for transaction in transactions:
+        if transaction['type'] == 'expense':
+            group = key(transaction)
+            spending[group] = spending.get(group, 0) + transaction['amount']
+    return {budget: spending.get(budget_group(budget), 0) for budget in budgets}
 
-    return generate_alerts(list(budgets.keys()), [])
+def evaluate_budget_alerts(budgets: Mapping[Hashable, int], usage: Mapping[Hashable, int],
+                           warning_percent: int = 90) -> List[Dict]:
+    """Return an alert record for every budget that is exceeded or close to it."""
+    alerts = []
+    for key, budget in budgets.items():
+        used = usage.get(key, 0)
+        if used > budget:
+            alerts.append({'key': key, 'status': 'exceeded', 'used': used, 'budget': budget})
+        elif 100 * used > warning_percent * budget:  # integer compare, exact at the boundary
+            alerts.append({'key': key, 'status': 'warning', 'used': used, 'budget': budget})
+    return alerts
+
+def format_budget_alert(alert: Dict) -> str:
+    """Format an alert record as a message for the user."""
+    if alert['status'] == 'exceeded':
+        return f"Budget exceeded for {alert['key']}. Used: ${format_cents(alert['used'])}, Budget: ${format_cents(alert['budget'])}"
+    return f"Warning: You are close to exceeding the budget for {alert['key']}. Used: ${format_cents(alert['used'])}, Budget: ${format_cents(alert['budget'])}"
+
+@instrumented()
+def budget_alert(budgets: Dict[str, int], usage: Dict[str, int]) -> List[str]:
+    """Generate alerts when the budget for a category is exceeded or close to it."""
+    return [format_budget_alert(alert) for alert in evaluate_budget_alerts(budgets, usage)]
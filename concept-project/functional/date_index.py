@@ -0,0 +1,101 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import common_path
+from categories import registry
+from parsing import parse_date
+
+# A date index holds the ledger's transactions sorted by date next to a parallel list of
+# their date ordinals, plus the same pair per category ID. Range queries bisect both ends,
+# so they cost O(log n + k) for k matching transactions. Added transactions wait in a
+# pending list and are merged in on the next query, so adding a batch costs one merge
+# rather than an O(n) list.insert per transaction.
+
+def date_ordinal(value: str) -> int:
+    """Turn a YYYY-MM-DD date into its proleptic ordinal."""
+    return parse_date(value).toordinal()
+
+def empty_postings() -> Dict:
+    return {'ordinals': [], 'transactions': [], 'pending': []}
+
+def build_date_index(transactions: Iterable[Dict]) -> Dict:
+    """Build a date index over a ledger with one sort, keeping equal dates in ledger order."""
+    keyed = sorted(((date_ordinal(transaction['date']), transaction) for transaction in transactions), key=_first)
+    index = {'all': empty_postings(), 'categories': {}}
+    for ordinal, transaction in keyed:
+        _append(index['all'], ordinal, transaction)
+        _append(index['categories'].setdefault(transaction['category_id'], empty_postings()), ordinal, transaction)
+    return index
+
+def _first(pair: Tuple) -> int:
+    return pair[0]
+
+def _append(postings: Dict, ordinal: int, transaction: Dict) -> None:
+    postings['ordinals'].append(ordinal)
+    postings['transactions'].append(transaction)
+
+def extend_date_index(index: Dict, transactions: Iterable[Dict]) -> Dict:
+    """Add transactions to a date index in place; they are merged in on the next query."""
+    for transaction in transactions:
+        pair = (date_ordinal(transaction['date']), transaction)
+        index['all']['pending'].append(pair)
+        index['categories'].setdefault(transaction['category_id'], empty_postings())['pending'].append(pair)
+    return index
+
+def has_pending(index: Dict) -> bool:
+    """Tell whether a query would have to merge added transactions, and so change the index."""
+    return bool(index['all']['pending'])
+
+def merge_pending(index: Dict) -> Dict:
+    """Merge every added transaction into the sorted lists now rather than on the next query."""
+    _merge(index['all'])
+    for postings in index['categories'].values():
+        _merge(postings)
+    return index
+
+def _merge(postings: Dict) -> None:
+    if not postings['pending']:
+        return
+    batch = sorted(postings['pending'], key=_first)
+    postings['pending'] = []
+    ordinals, transactions = postings['ordinals'], postings['transactions']
+    if ordinals and batch[0][0] < ordinals[-1]:
+        # Copy the sorted lists once, slicing in the batch where bisect places it; equal dates keep their order
+        merged_ordinals, merged_transactions = [], []
+        done = 0
+        for ordinal, transaction in batch:
+            position = bisect_right(ordinals, ordinal, done)
+            merged_ordinals += ordinals[done:position]
+            merged_transactions += transactions[done:position]
+            merged_ordinals.append(ordinal)
+            merged_transactions.append(transaction)
+            done = position
+        merged_ordinals += ordinals[done:]
+        merged_transactions += transactions[done:]
+        postings['ordinals'], postings['transactions'] = merged_ordinals, merged_transactions
+    else:
+        ordinals.extend(ordinal for ordinal, _ in batch)
+        transactions.extend(transaction for _, transaction in batch)
+
+def transactions_between(index: Dict, start: str, end: str, category: Optional[str] = None) -> List[Dict]:
+    """Get the transactions dated from start to end inclusive in date order, optionally for one category."""
+    if category is None:
+        postings = index['all']
+    else:
+        category_id = registry.lookup(category)
+        postings = index['categories'].get(category_id) if category_id is not None else None
+        if postings is None:
+            return []
+    _merge(postings)
+    ordinals = postings['ordinals']
+    low = bisect_left(ordinals, date_ordinal(start))
+    high = bisect_right(ordinals, date_ordinal(end), low)
+    return postings['transactions'][low:high]
+
+def month_bounds(year: int, month: int) -> Tuple[str, str]:
+    """Get the first and last date of a month."""
+    following = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return date(year, month, 1).isoformat(), date.fromordinal(following.toordinal() - 1).isoformat()
+
+def previous_month(year: int, month: int) -> Tuple[int, int]:
+    return (year, month - 1) if month > 1 else (year - 1, 12)
@@ -0,0 +1,62 @@
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+import numpy as np
+import common_path
+from categories import registry
+
+class TransactionFrame(NamedTuple):
+    """Columnar view of a ledger with dictionary-encoded categories and amounts in integer cents."""
+    categories: Tuple[str, ...]
+    category_codes: np.ndarray
+    amounts: np.ndarray
+    dates: np.ndarray
+    is_expense: np.ndarray
+
+def frame_from_transactions(transactions: Iterable[Dict]) -> TransactionFrame:
+    """Convert a list of transaction dicts into a TransactionFrame."""
+    category_index = {}
+    codes, amounts, dates, is_expense = [], [], [], []
+    for transaction in transactions:
+        codes.append(category_index.setdefault(transaction['category_id'], len(category_index)))
+        amounts.append(transaction['amount'])
+        dates.append(transaction['date'])
+        is_expense.append(transaction['type'] == 'expense')
+    return TransactionFrame(
+        categories=tuple(registry.names[category_id] for category_id in category_index),
+        category_codes=np.array(codes, dtype=np.int32),
+        amounts=np.array(amounts, dtype=np.int64),
+        dates=np.array(dates, dtype='datetime64[D]'),
+        is_expense=np.array(is_expense, dtype=bool)
+    )
+
+def frame_to_transactions(frame: TransactionFrame) -> List[Dict]:
+    """Convert a TransactionFrame back into a list of transaction dicts."""
+    category_ids = [registry.intern(category) for category in frame.categories]
+    return [
+        {'amount': int(amount), 'category': registry.names[category_ids[code]], 'date': str(date),
+         'type': 'expense' if expense else 'income', 'category_id': category_ids[code]}
+        for code, amount, date, expense in zip(frame.category_codes, frame.amounts, frame.dates, frame.is_expense)
+    ]
+
+def _expense_totals(frame: TransactionFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum expenses and count expense rows per category code."""
+    codes = frame.category_codes[frame.is_expense]
+    # bincount sums weights in float64, which is exact for totals below 2**53 cents
+    totals = np.bincount(codes, weights=frame.amounts[frame.is_expense], minlength=len(frame.categories)).astype(np.int64)
+    counts = np.bincount(codes, minlength=len(frame.categories))
+    return totals, counts
+
+def frame_spending_summary(frame: TransactionFrame) -> Dict[str, int]:
+    """Generate a spending summary by category."""
+    totals, counts = _expense_totals(frame)
+    return {frame.categories[code]: int(totals[code]) for code in np.flatnonzero(counts)}
+
+def frame_overall_spending(frame: TransactionFrame) -> int:
+    """Calculate total spending (only expenses)."""
+    return int(frame.amounts[frame.is_expense].sum())
+
+def frame_track_budget_usage(budgets: Dict[str, int], frame: TransactionFrame) -> Dict[str, int]:
+    """Track the spending for each category against the budget."""
+    totals, _ = _expense_totals(frame)
+    category_index = {registry.intern(category): code for code, category in enumerate(frame.categories)}
+    codes = {category: category_index.get(registry.intern(category)) for category in budgets}
+    return {category: int(totals[code]) if code is not None else 0 for category, code in codes.items()}
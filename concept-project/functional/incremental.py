@@ -0,0 +1,60 @@
+import os
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Mapping, Tuple
+from ingest import new_report, parse_text
+import common_path
+from file_changes import read_file_changes
+from instrument import instrumented
+
+def transaction_key(transaction: Dict) -> Tuple:
+    """Identify a transaction by its date, amount, category and type for duplicate detection."""
+    return (transaction['date'], transaction['amount'], transaction['category_id'], transaction['type'])
+
+def drop_duplicates(transactions: Iterable[Dict], duplicates: Counter) -> List[Dict]:
+    """Skip one transaction for every copy of its key left in duplicates, consuming the counts.
+
+    A file holding more copies of a transaction than the ledger keeps the extra ones.
+    """
+    fresh = []
+    for transaction in transactions:
+        key = transaction_key(transaction)
+        if duplicates[key] > 0:
+            duplicates[key] -= 1
+        else:
+            fresh.append(transaction)
+    return fresh
+
+@instrumented(rows=lambda result, *args, **kwargs: len(result[0]))
+def import_incremental(file_paths: Iterable[str], manifest: Mapping[str, Dict],
+                       ledger: Iterable[Dict]) -> Tuple[List[Dict], Dict[str, Dict], List[Dict]]:
+    """Import only what changed in each file since it was recorded in the manifest.
+
+    Unchanged files are skipped after a stat, appended CSV files only have their new rows parsed,
+    and new or rewritten files are parsed in full with rows already in the ledger dropped.
+    Returns the new transactions, the updated manifest and one report per file,
+    which counts the rows rejected and keeps the first of their errors.
+    """
+    manifest = dict(manifest)
+    added, reports = [], []
+    ledger_keys = None
+    for file_path in file_paths:
+        parsed = new_report(file_path)
+        try:
+            status, text, entry = read_file_changes(file_path, manifest.get(os.path.abspath(file_path)))
+            transactions = parse_text(text, parsed)
+        except Exception as e:
+            reports.append({'file': file_path, 'status': 'error', 'rows': 0, 'rejected': 0, 'errors': [], 'error': f"{type(e).__name__}: {e}"})
+            continue
+        if status in ('new', 'rewritten'):
+            # Only built once some file has to be read in full
+            if ledger_keys is None:
+                ledger_keys = Counter(map(transaction_key, chain(ledger, added)))
+            transactions = drop_duplicates(transactions, ledger_keys.copy())
+        if ledger_keys is not None:
+            ledger_keys.update(map(transaction_key, transactions))
+        added.extend(transactions)
+        manifest[entry['path']] = entry
+        reports.append({'file': file_path, 'status': status, 'rows': len(transactions),
+                        'rejected': parsed['rejected'], 'errors': parsed['errors'], 'error': None})
+    return added, manifest, reports
@@ -0,0 +1,57 @@
+import io
+from typing import Any, Dict, Iterator, List, Mapping, TextIO
+import common_path
+from categories import intern_category
+from parsing import DEFAULT_CHUNK_SIZE, field_getter, parse_stream, validate_fields
+
+# Text files are sniffed and decoded by the shared parsing module; this frontend builds each
+# row as a transaction dict with an interned category and keeps a dict report of bad rows.
+
+MAX_REPORTED_ERRORS = 100
+
+def new_report(source: str = '') -> Dict:
+    """Create an empty error report: rows seen, rows rejected and the first few errors."""
+    return {'source': source, 'schema': None, 'rows': 0, 'rejected': 0, 'errors': []}
+
+def record_error(report: Dict, number: int, record: Any, error: Exception) -> None:
+    """Count a rejected row, keeping its details while the report has room."""
+    report['rejected'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': number, 'record': record, 'error': str(error)})
+
+def format_report(report: Dict, limit: int = 5) -> str:
+    """Summarise a report in a line, followed by up to limit of its errors."""
+    lines = [f"{report['source'] or 'input'}: {report['rows'] - report['rejected']} of {report['rows']} rows imported"
+             + (f", {report['rejected']} rejected" if report['rejected'] else "")]
+    lines.extend(f"  row {error['row']}: {error['error']}" for error in report['errors'][:limit])
+    if report['rejected'] > limit:
+        lines.append(f"  ... and {report['rejected'] - limit} more")
+    return "\n".join(lines)
+
+def convert_fields(amount: Any, category: Any, date_text: Any, kind: Any) -> Dict:
+    """Build a transaction from raw field values, raising ValueError for anything invalid."""
+    cents, category, date_text, kind = validate_fields(amount, category, date_text, kind)
+    return intern_category({'amount': cents, 'category': category, 'date': date_text, 'type': kind})
+
+def convert_record(record: Any, columns: Mapping[str, Any]) -> Dict:
+    """Build a transaction from one decoded row or object, raising ValueError for anything invalid."""
+    try:
+        fields = field_getter(columns)(record)
+    except (KeyError, IndexError):
+        raise ValueError("missing fields") from None
+    return convert_fields(*fields)
+
+def iter_parsed(file: TextIO, report: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+    """Sniff the layout of a text stream and yield its transactions, recording bad rows in report."""
+    def reject(number: int, record: Any, error: Exception) -> None:
+        report['rows'] += 1
+        record_error(report, number, record, error)
+
+    report['schema'], transactions = parse_stream(file, convert_fields, reject, chunk_size)
+    for transaction in transactions:
+        report['rows'] += 1
+        yield transaction
+
+def parse_text(text: str, report: Dict) -> List[Dict]:
+    """Parse the whole text of a file in any supported layout."""
+    return list(iter_parsed(io.StringIO(text), report))
@@ -1,19 +1,44 @@
 import os
 from transaction import record_transaction, import_transactions, export_transactions
-from budget import set_budget, track_budget_usage, budget_alert
+from budget import set_budget, budget_alert
 from savings import set_savings_goal, display_savings_goal_details
-from analytics import spending_summary, overall_spending, spending_trends, spending_insights
+from analytics import period_spending_trends, spending_insights
+from date_index import previous_month
+from rollup import latest_period, period_summary, update_rollup
+from persistent import PersistentVector, PersistentMap
+import common_path
+from money import format_cents
+from parallel import import_files_parallel
+from streams import text_format
+from incremental import import_incremental
+from ingest import new_report, format_report
+import instrument
+import memo
+from memo import cached_call
+from storage import (open_ledger, load_rollup, load_transactions, save_transactions, replace_transactions,
+                     load_import_manifest, save_import, sql_spending_summary, sql_overall_spending, sql_track_budget_usage)
 from user_input import (get_user_input_for_transaction, get_user_input_for_budget,
                         get_user_input_for_savings_goal, get_user_input_for_file_import)
 
+LEDGER_PATH = 'ledger.db'
+STATS_PATH = 'instrumentation.json'
+
 def main():
-    csv_files = [f for f in os.listdir() if f.endswith('.csv')]
-    json_files = [f for f in os.listdir() if f.endswith('.json')]
+    instrument.configure_from_environment()
+    memo.configure_from_environment()
+    csv_files = [f for f in os.listdir() if text_format(f) == '.csv']
+    json_files = [f for f in os.listdir() if text_format(f) in ('.json', '.jsonl')]
+    ledger_files = [f for f in os.listdir() if f.endswith('.ledger')]
 
-    transactions = []
-    budgets = {}
-    goals = []
-    previous_month_transactions = []
+    ledger = open_ledger(LEDGER_PATH)
+    # The ledger stays in SQLite: budgets and summaries are SQL aggregates, trends come from the
+    # rollup and exports stream the rows, so it never has to fit in memory. version is replaced
+    # by every write to it, naming the ledger's version for memoized reports.
+    version = object()
+    budgets = PersistentMap()
+    goals = PersistentVector()
+    # Per-period spending totals, built from SQL on first use and kept up to date by every write
+    rollup = None
 
     def menu():
         print("\n--- Personal Finance Management ---")
@@ -26,18 +51,54 @@ def main():
         print("7. View Budget Alerts")
         print("8. Import Transactions")
         print("9. Export Transactions")
-        print("10. Exit")
+        print("10. Instrumentation")
+        print("11. Exit")
         
-        choice = input("Choose an option (1-10): ")
+        choice = input("Choose an option (1-11): ")
         return choice
 
+    def stored(added):
+        """Bring the rollup up to date with rows just saved to the ledger."""
+        nonlocal version
+        if rollup is not None:
+            for transaction in added:
+                update_rollup(rollup, transaction)
+        version = object()
+
+    def replace_from_file(file_path, kind):
+        """Replace the ledger with a file's transactions, keeping it as it was if the file can't be used."""
+        nonlocal rollup, version
+        report = new_report(file_path)
+        try:
+            imported = import_transactions(file_path, report)
+            if report['rejected'] and not imported:
+                raise ValueError(f"none of its {report['rows']} rows are valid")
+            replace_transactions(ledger, imported)
+        except Exception as e:
+            print(f"Failed to import {kind} file, the ledger was not changed: {e}")
+            if report['rejected']:
+                print(format_report(report))
+            return
+        rollup, version = None, object()
+        print(f"Transactions imported successfully from {kind} file: {file_path}")
+        if report['rows']:
+            print(format_report(report))
+
+    def current_rollup():
+        nonlocal rollup
+        if rollup is None:
+            rollup = load_rollup(ledger)
+        return rollup
+
     def handle_choice(choice):
-        nonlocal transactions, budgets, goals, previous_month_transactions
+        nonlocal budgets, goals
 
         if choice == '1':
             try:
                 transaction = get_user_input_for_transaction()
-                transactions = record_transaction(transactions, transaction['amount'], transaction['category'], transaction['date'], transaction['type'])
+                recorded = record_transaction((), transaction['amount'], transaction['category'], transaction['date'], transaction['type'])
+                save_transactions(ledger, recorded)
+                stored(recorded)
                 print(f"Transaction added: {transaction}")
             except ValueError as e:
                 print(e)
@@ -48,10 +109,10 @@ def main():
             print(f"Budget set for {category}: ${amount}")
 
         elif choice == '3':
-            usage = track_budget_usage(budgets, transactions)
+            usage = cached_call(sql_track_budget_usage, ledger, budgets, version=version)
             print("Budget Usage:")
             for category, amount in usage.items():
-                print(f"{category}: ${amount}")
+                print(f"{category}: ${format_cents(amount)}")
 
         elif choice == '4':
             target, months = get_user_input_for_savings_goal()
@@ -62,27 +123,33 @@ def main():
                 print(e)
 
         elif choice == '5':
-            summary = spending_summary(transactions)
-            total_spending = overall_spending(transactions)
+            summary = cached_call(sql_spending_summary, ledger, version=version)
+            total_spending = cached_call(sql_overall_spending, ledger, version=version)
             print("Spending Summary:")
             for category, amount in summary.items():
-                print(f"{category}: ${amount}")
-            print(f"Total Spending: ${total_spending}")
+                print(f"{category}: ${format_cents(amount)}")
+            print(f"Total Spending: ${format_cents(total_spending)}")
 
         elif choice == '6':
-            trends = spending_trends(transactions, previous_month_transactions)
-            print("Spending Trends (current vs previous month):")
+            # Comparing two months of the rollup takes time in the number of categories, not rows
+            totals = current_rollup()
+            period = latest_period(totals, 'month')
+            if period is None:
+                print("No spending recorded yet.")
+                return True
+            trends = period_spending_trends(totals, 'month', period, previous_month(*period))
+            current_summary = period_summary(totals, 'month', period)
+            print(f"Spending Trends ({period[0]}-{period[1]:02d} vs previous month):")
             for category, trend in trends.items():
-                print(f"{category}: ${trend}")
-            
-            current_summary = spending_summary(transactions)
+                print(f"{category}: ${format_cents(trend)}")
+
             insights = spending_insights(trends, current_summary)
             print("Spending Insights:")
             for insight in insights:
                 print(insight)
 
         elif choice == '7':
-            usage = track_budget_usage(budgets, transactions)
+            usage = cached_call(sql_track_budget_usage, ledger, budgets, version=version)
             alerts = budget_alert(budgets, usage)
             print("Budget Alerts:")
             for alert in alerts:
@@ -91,18 +158,17 @@ def main():
         elif choice == '8':
             print("Select the file type to import:")
             print("1. CSV")
-            print("2. JSON")
-            file_type_choice = input("Enter the number for the file type (1 or 2): ").strip()
+            print("2. JSON or JSON Lines")
+            print("3. Binary ledger")
+            print("4. All CSV, JSON and binary ledger files (added to current transactions)")
+            print("5. New rows from all CSV and JSON files (skips anything already imported)")
+            file_type_choice = input("Enter the number for the file type (1, 2, 3, 4 or 5): ").strip()
 
             if file_type_choice == '1':
                 if csv_files:
                     selected_file = get_user_input_for_file_import('csv', csv_files)
                     if selected_file:
-                        try:
-                            transactions = import_transactions(selected_file)
-                            print(f"Transactions imported successfully from CSV file: {selected_file}")
-                        except Exception as e:
-                            print(f"Failed to import CSV file: {e}")
+                        replace_from_file(selected_file, 'CSV')
                 else:
                     print("No CSV files found in the current directory.")
 
@@ -110,48 +176,121 @@ def main():
                 if json_files:
                     selected_file = get_user_input_for_file_import('json', json_files)
                     if selected_file:
-                        try:
-                            transactions = import_transactions(selected_file)
-                            print(f"Transactions imported successfully from JSON file: {selected_file}")
-                        except Exception as e:
-                            print(f"Failed to import JSON file: {e}")
+                        replace_from_file(selected_file, 'JSON')
                 else:
                     print("No JSON files found in the current directory.")
 
+            elif file_type_choice == '3':
+                if ledger_files:
+                    selected_file = get_user_input_for_file_import('ledger', ledger_files)
+                    if selected_file:
+                        replace_from_file(selected_file, 'binary ledger')
+                else:
+                    print("No binary ledger files found in the current directory.")
+
+            elif file_type_choice == '4':
+                all_files = sorted(csv_files + json_files + ledger_files)
+                if all_files:
+                    merged, reports = import_files_parallel(all_files)
+                    for report in reports:
+                        if report['error']:
+                            print(f"{report['file']}: failed after {report['seconds']:.3f}s - {report['error']}")
+                        else:
+                            rejected = f", {report['rejected']} rejected" if report['rejected'] else ""
+                            print(f"{report['file']}: {report['rows']} transactions in {report['seconds']:.3f}s{rejected}")
+                    try:
+                        save_transactions(ledger, merged)
+                        stored(merged)
+                        print(f"Imported {len(merged)} transactions from {len(all_files)} files.")
+                    except Exception as e:
+                        print(f"Failed to store imported transactions: {e}")
+                else:
+                    print("No files found in the current directory.")
+
+            elif file_type_choice == '5':
+                # Change detection works on the raw bytes, so only uncompressed CSV and JSON files take part
+                all_files = sorted(f for f in csv_files + json_files if f.endswith(('.csv', '.json')))
+                if all_files:
+                    # The stored rows are only read if some file is new or rewritten
+                    added, manifest, reports = import_incremental(all_files, load_import_manifest(ledger), load_transactions(ledger))
+                    for report in reports:
+                        if report['error']:
+                            print(f"{report['file']}: failed - {report['error']}")
+                        else:
+                            rejected = f", {report['rejected']} rejected" if report['rejected'] else ""
+                            print(f"{report['file']}: {report['status']}, {report['rows']} new transactions{rejected}")
+                    try:
+                        save_import(ledger, added, manifest)
+                        stored(added)
+                        print(f"Imported {len(added)} new transactions from {len(all_files)} files.")
+                    except Exception as e:
+                        print(f"Failed to store imported transactions: {e}")
+                else:
+                    print("No CSV or JSON files found in the current directory.")
+
             else:
-                print("Invalid choice. Please enter either '1' or '2'.")
+                print("Invalid choice. Please enter '1', '2', '3', '4' or '5'.")
 
         elif choice == '9':
             print("Select the file type to export:")
             print("1. CSV")
             print("2. JSON")
+            print("3. JSON Lines")
+            print("4. Binary ledger")
             
-            file_type_choice = input("Enter the number for the file type (1 or 2): ").strip()
+            file_type_choice = input("Enter the number for the file type (1, 2, 3 or 4): ").strip()
+            extension = {'1': '.csv', '2': '.json', '3': '.jsonl', '4': '.ledger'}.get(file_type_choice)
 
-            if file_type_choice == '1':
-                file_name = input("Enter the name of the file to export (e.g., transactions.csv): ").strip()
-                if not file_name.endswith('.csv'):
-                    file_name += '.csv'
+            if extension is None:
+                print("Invalid choice. Please enter '1' (CSV), '2' (JSON), '3' (JSON Lines) or '4' (binary ledger).")
+            else:
+                # Text formats can be compressed on the fly by adding .gz or .xz to the name
+                allowed = (extension,) if extension == '.ledger' else (extension, extension + '.gz', extension + '.xz')
+                hint = " (add .gz or .xz to compress)" if len(allowed) > 1 else ""
+                file_name = input(f"Enter the name of the file to export (e.g., transactions{extension}){hint}: ").strip()
+                if not file_name.endswith(allowed):
+                    file_name += extension
                 try:
-                    export_transactions(file_name, transactions)
+                    export_transactions(file_name, load_transactions(ledger))
                     print(f"Transactions exported successfully to {file_name}.")
                 except Exception as e:
                     print(f"Failed to export transactions: {e}")
 
-            elif file_type_choice == '2':
-                file_name = input("Enter the name of the file to export (e.g., transactions.json): ").strip()
-                if not file_name.endswith('.json'):
-                    file_name += '.json'
-                try:
-                    export_transactions(file_name, transactions)
-                    print(f"Transactions exported successfully to {file_name}.")
-                except Exception as e:
-                    print(f"Failed to export transactions: {e}")
+        elif choice == '10':
+            print(f"Instrumentation is {'on' if instrument.is_enabled() else 'off'}.")
+            print("1. Turn on (timings and rows)")
+            print("2. Turn on with peak memory tracking (slower)")
+            print("3. Turn off")
+            print("4. Show stats")
+            print(f"5. Dump stats to {STATS_PATH}")
+            print("6. Reset stats")
+            instrument_choice = input("Enter your choice (1-6): ").strip()
 
+            if instrument_choice in ('1', '2'):
+                instrument.disable()
+                instrument.enable(trace_memory=instrument_choice == '2')
+                print("Instrumentation turned on.")
+            elif instrument_choice == '3':
+                instrument.disable()
+                print("Instrumentation turned off.")
+            elif instrument_choice == '4':
+                records = instrument.stats()
+                print(instrument.format_stats(records) if records else "No stats recorded yet.")
+                print(memo.format_stats(memo.stats()))
+            elif instrument_choice == '5':
+                try:
+                    instrument.dump_stats(STATS_PATH)
+                    print(f"Stats written to {STATS_PATH}.")
+                except OSError as e:
+                    print(f"Failed to write stats: {e}")
+            elif instrument_choice == '6':
+                instrument.reset()
+                memo.reset_stats()
+                print("Stats reset.")
             else:
-                print("Invalid choice. Please enter either '1' (CSV) or '2' (JSON).")
+                print("Invalid choice. Please enter a number from 1 to 6.")
 
-        elif choice == '10':
+        elif choice == '11':
             print("Exiting the program.")
             return False
         
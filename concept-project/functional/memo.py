@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+from persistent import PersistentVector, PersistentMap
+
+# Memoized analytics. A result is filed under its function and arguments, and remembers the
+# version it was computed for. Persistent values are never changed in place, so a
+# PersistentVector or PersistentMap argument *is* a version of the ledger or the budgets:
+# passing a newer one is a miss that replaces the stale result. Results that depend on
+# something the arguments don't show, such as an SQLite ledger, take that version explicitly.
+# At most max_entries results are kept, least recently used evicted first.
+
+DEFAULT_MAX_ENTRIES = 128
+_VERSIONED = object()  # stands in for an argument matched by identity
+
+_entries: 'OrderedDict[Tuple, Tuple[Tuple, Any]]' = OrderedDict()
+_max_entries = DEFAULT_MAX_ENTRIES
+_counts = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+_lock = threading.Lock()
+
+def configure(max_entries: int) -> None:
+    """Bound the cache to max_entries results, evicting any over the limit; 0 turns caching off."""
+    global _max_entries
+    with _lock:
+        _max_entries = max(0, max_entries)
+        _evict()
+
+def configure_from_environment() -> None:
+    """Size the cache from FINANCE_CACHE_SIZE when it is set."""
+    setting = os.environ.get('FINANCE_CACHE_SIZE', '')
+    if setting:
+        configure(int(setting))
+
+def clear() -> None:
+    """Drop every cached result; the hit and miss counts are kept."""
+    with _lock:
+        _entries.clear()
+
+def reset_stats() -> None:
+    with _lock:
+        for name in _counts:
+            _counts[name] = 0
+
+def stats() -> Dict[str, Any]:
+    """Return hits, misses, invalidations (misses that replaced a stale result), evictions and the current size."""
+    with _lock:
+        lookups = _counts['hits'] + _counts['misses']
+        return dict(_counts, entries=len(_entries), max_entries=_max_entries,
+                    hit_rate=_counts['hits'] / lookups if lookups else 0.0)
+
+def format_stats(record: Dict[str, Any]) -> str:
+    return (f"Analytics cache: {record['hits']} hits, {record['misses']} misses ({record['hit_rate']:.1%} hit rate), "
+            f"{record['invalidations']} invalidated, {record['evictions']} evicted, "
+            f"{record['entries']} of {record['max_entries']} entries in use")
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+def _key(function: Callable, args: Tuple, version: Any) -> Tuple[Tuple, Tuple]:
+    """Split a call into the key it is filed under and the versions its result is valid for."""
+    call, versions = [function], [version]
+    for argument in args:
+        if isinstance(argument, (PersistentVector, PersistentMap)) or not _is_hashable(argument):
+            call.append(_VERSIONED)
+            versions.append(argument)
+        else:
+            call.append(argument)
+    return tuple(call), tuple(versions)
+
+def _evict() -> None:
+    while len(_entries) > _max_entries:
+        _entries.popitem(last=False)
+        _counts['evictions'] += 1
+
+def cached_call(function: Callable, *args: Any, version: Any = None) -> Any:
+    """Return function(*args), reusing the result of an earlier call with the same arguments and versions.
+
+    Hashable arguments are matched by value. Persistent values, any other unhashable arguments
+    and version are matched by identity, so a mutable argument must only change along with version.
+    Results are shared between callers and must not be modified.
+    """
+    call, versions = _key(function, args, version)
+    with _lock:
+        entry = _entries.get(call)
+        if entry is not None and all(cached is current for cached, current in zip(entry[0], versions)):
+            _entries.move_to_end(call)
+            _counts['hits'] += 1
+            return entry[1]
+        _counts['misses'] += 1
+    result = function(*args)
+    with _lock:
+        if _max_entries:
+            if call in _entries:
+                _counts['invalidations'] += 1
+            _entries[call] = (versions, result)
+            _entries.move_to_end(call)
+            _evict()
+    return result
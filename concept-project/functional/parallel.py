@@ -0,0 +1,147 @@
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from aggregate import aggregate_transactions, empty_aggregate, merge_aggregates
+from transaction import import_transactions, iter_transactions
+from ingest import convert_record, new_report
+import common_path
+from categories import intern_category
+from instrument import instrumented
+from parsing import column_map
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Ledger inherited by forked workers so they can read their chunk without it being pickled.
+# There is one handoff per process, so the lock keeps concurrent callers from forking each
+# other's ledger.
+_shared_transactions = None
+_shared_lock = threading.Lock()
+
+def import_file_timed(file_path: str) -> Dict:
+    """Import one file and record how long it took, how many rows were rejected or why it failed."""
+    start = time.perf_counter()
+    parsed = new_report(file_path)
+    try:
+        if file_path.endswith('.ledger'):
+            transactions = import_transactions(file_path)
+        else:
+            # iter_transactions raises on unreadable files instead of printing and returning []
+            transactions = list(iter_transactions(file_path, report=parsed))
+        error = None
+    except Exception as e:
+        transactions, error = [], f"{type(e).__name__}: {e}"
+    return {'file': file_path, 'transactions': transactions, 'seconds': time.perf_counter() - start,
+            'rejected': parsed['rejected'], 'errors': parsed['errors'], 'error': error}
+
+@instrumented(rows=lambda result, *args, **kwargs: len(result[0]))
+def import_files_parallel(file_paths: List[str], max_workers: Optional[int] = None) -> Tuple[List[Dict], List[Dict]]:
+    """Import many files across processes and merge them in the order the files were given.
+
+    Returns the merged transactions and one report per file with its row and rejected counts, timing and error.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(import_file_timed, file_paths))
+    # Category IDs assigned in the workers mean nothing here, so intern again in this process
+    merged = [intern_category(transaction) for result in results for transaction in result['transactions']]
+    reports = [{'file': result['file'], 'rows': len(result['transactions']), 'rejected': result['rejected'],
+                'errors': result['errors'], 'seconds': result['seconds'], 'error': result['error']}
+               for result in results]
+    return merged, reports
+
+def run_aggregation(transactions: Iterable[Dict], workers: int = 1) -> Dict:
+    """Aggregate serially, or across processes when more than one worker is requested."""
+    if workers > 1:
+        return aggregate_parallel(transactions, max_workers=workers)
+    return aggregate_transactions(transactions)
+
+def aggregate_parallel(transactions: Iterable[Dict], chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: Optional[int] = None) -> Dict:
+    """Aggregate a ledger in fixed-size chunks across processes and merge the partials in chunk order.
+
+    Chunk boundaries depend only on chunk_rows, never on the number of workers. Calls from
+    different threads run one at a time.
+    """
+    global _shared_transactions
+    if not isinstance(transactions, Sequence) or 'fork' not in multiprocessing.get_all_start_methods():
+        return _aggregate_batches(_batches(transactions, chunk_rows), max_workers)
+    bounds = [(start, min(start + chunk_rows, len(transactions))) for start in range(0, len(transactions), chunk_rows)]
+    with _shared_lock:
+        _shared_transactions = transactions
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork')) as executor:
+                partials = list(executor.map(_aggregate_shared_range, bounds))
+        finally:
+            _shared_transactions = None
+    return reduce(merge_aggregates, partials, empty_aggregate())
+
+def aggregate_file_parallel(file_path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES, max_workers: Optional[int] = None) -> Dict:
+    """Aggregate a transaction file across processes without loading it into the parent.
+
+    CSV files are split into byte ranges that each worker parses itself; other
+    formats are streamed to the workers in batches. CSV fields must not contain newlines.
+    """
+    if not file_path.endswith('.csv'):
+        return aggregate_parallel(iter_transactions(file_path), max_workers=max_workers)
+    with open(file_path, 'rb') as file:
+        data_start = len(file.readline())
+    file_size = os.path.getsize(file_path)
+    ranges = [(file_path, start, min(start + chunk_bytes, file_size)) for start in range(data_start, file_size, chunk_bytes)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        partials = list(executor.map(_aggregate_csv_range, ranges))
+    return reduce(merge_aggregates, partials, empty_aggregate())
+
+def _batches(transactions: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(transactions)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _aggregate_batches(batches: Iterable[List[Dict]], max_workers: Optional[int]) -> Dict:
+    """Send batches to workers with a bounded number in flight, merging results in submission order."""
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    total = empty_aggregate()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_aggregate_batch, batch))
+            if len(pending) >= max_in_flight:
+                total = merge_aggregates(total, pending.popleft().result())
+        while pending:
+            total = merge_aggregates(total, pending.popleft().result())
+    return total
+
+def _aggregate_batch(batch: List[Dict]) -> Dict:
+    """Aggregate a pickled batch, re-interning its categories since the IDs came from another process."""
+    return aggregate_transactions(map(intern_category, batch))
+
+def _aggregate_shared_range(bounds: Tuple[int, int]) -> Dict:
+    start, stop = bounds
+    return aggregate_transactions(_shared_transactions[index] for index in range(start, stop))
+
+def _aggregate_csv_range(task: Tuple[str, int, int]) -> Dict:
+    """Aggregate the CSV rows whose lines start inside [start, end)."""
+    file_path, start, end = task
+    with open(file_path, 'rb') as file:
+        columns = column_map(next(csv.reader([file.readline().decode('utf-8-sig')])))
+        # Back up one byte so a line beginning exactly at start is not skipped
+        file.seek(start - 1)
+        file.readline()
+        lines = _lines_until(file, end)
+        return aggregate_transactions(convert_record(row, columns) for row in csv.reader(lines) if row)
+
+def _lines_until(file, end: int) -> Iterator[str]:
+    while file.tell() < end:
+        line = file.readline()
+        if not line:
+            return
+        yield line.decode('utf-8')
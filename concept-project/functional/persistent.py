@@ -0,0 +1,183 @@
+from collections.abc import Mapping, Sequence
+from itertools import chain, islice
+from typing import Any, Hashable, Iterable, Iterator, NamedTuple, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+class PersistentVector(Sequence):
+    """Immutable vector that shares structure between versions.
+
+    Elements live in a 32-way trie of tuples plus a tail chunk, so append
+    copies at most one chunk and one path instead of the whole history.
+    """
+    __slots__ = ('_count', '_shift', '_root', '_tail')
+
+    def __init__(self, items: Iterable = ()):
+        self._count, self._shift, self._root, self._tail = 0, _BITS, (), ()
+        for chunk in _chunks(items):
+            self._count, self._shift, self._root, self._tail = self._pushed(chunk)
+
+    @classmethod
+    def _make(cls, count: int, shift: int, root: Tuple, tail: Tuple) -> 'PersistentVector':
+        vector = cls.__new__(cls)
+        vector._count, vector._shift, vector._root, vector._tail = count, shift, root, tail
+        return vector
+
+    def _pushed(self, chunk: Tuple) -> Tuple[int, int, Tuple, Tuple]:
+        """Return the parts of a vector whose tail is extended by a chunk of up to 32 items."""
+        if len(self._tail) + len(chunk) <= _WIDTH:
+            return self._count + len(chunk), self._shift, self._root, self._tail + chunk
+        split = _WIDTH - len(self._tail)
+        full_tail, rest = self._tail + chunk[:split], chunk[split:]
+        count = self._count + split
+        if (count >> _BITS) > (1 << self._shift):
+            root, shift = (self._root, _new_path(self._shift, full_tail)), self._shift + _BITS
+        else:
+            root, shift = _push_leaf(self._shift, self._root, count, full_tail), self._shift
+        return count + len(rest), shift, root, rest
+
+    def append(self, item: Any) -> 'PersistentVector':
+        """Return a new vector with item added at the end."""
+        return self._make(*self._pushed((item,)))
+
+    def extend(self, items: Iterable) -> 'PersistentVector':
+        """Return a new vector with all items added at the end, a chunk of 32 at a time."""
+        vector = self
+        for chunk in _chunks(items):
+            vector = self._make(*vector._pushed(chunk))
+        return vector
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._slice(*index.indices(self._count))
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("PersistentVector index out of range")
+        return self._leaf(index)[index & _MASK]
+
+    def _leaf(self, index: int) -> Tuple:
+        """Return the chunk holding index: the tail or a leaf of the trie."""
+        if index >= self._count - len(self._tail):
+            return self._tail
+        node, level = self._root, self._shift
+        while level > 0:
+            node = node[(index >> level) & _MASK]
+            level -= _BITS
+        return node
+
+    def _slice(self, start: int, stop: int, step: int) -> list:
+        """Return the items in range(start, stop, step) as a list, copying whole leaves for a contiguous slice."""
+        if step != 1:
+            return [self[index] for index in range(start, stop, step)]
+        items = []
+        while start < stop:
+            offset = start & _MASK
+            chunk = self._leaf(start)[offset:offset + stop - start]
+            items.extend(chunk)
+            start += len(chunk)
+        return items
+
+    def __iter__(self) -> Iterator:
+        return chain(chain.from_iterable(_iter_leaves(self._root, self._shift)), self._tail)
+
+    def __repr__(self) -> str:
+        return f"PersistentVector({list(self)!r})"
+
+def _chunks(items: Iterable) -> Iterator[Tuple]:
+    """Split items into tuples of 32, the last possibly shorter."""
+    iterator = iter(items)
+    chunk = tuple(islice(iterator, _WIDTH))
+    while chunk:
+        yield chunk
+        chunk = tuple(islice(iterator, _WIDTH))
+
+def _new_path(level: int, leaf: Tuple) -> Tuple:
+    """Wrap a leaf in single-child nodes down to the given level."""
+    return leaf if level == 0 else (_new_path(level - _BITS, leaf),)
+
+def _push_leaf(level: int, parent: Tuple, count: int, leaf: Tuple) -> Tuple:
+    """Copy the path to the rightmost slot and attach a full leaf there."""
+    index = ((count - 1) >> level) & _MASK
+    if level == _BITS:
+        child = leaf
+    elif index < len(parent):
+        child = _push_leaf(level - _BITS, parent[index], count, leaf)
+    else:
+        child = _new_path(level - _BITS, leaf)
+    return parent[:index] + (child,) + parent[index + 1:]
+
+def _iter_leaves(node: Tuple, level: int) -> Iterator[Tuple]:
+    """Yield the leaf chunks of a trie from left to right."""
+    if level == _BITS:
+        yield from node
+    else:
+        for child in node:
+            yield from _iter_leaves(child, level - _BITS)
+
+class _Bucket(NamedTuple):
+    key_hash: int
+    pairs: Tuple[Tuple[Hashable, Any], ...]
+
+def _assoc(node, shift: int, key_hash: int, key: Hashable, value: Any):
+    """Return (new_node, added) with key bound to value somewhere below node."""
+    if node is None:
+        return _Bucket(key_hash, ((key, value),)), True
+    if isinstance(node, _Bucket):
+        if node.key_hash == key_hash:
+            for i, (existing, _) in enumerate(node.pairs):
+                if existing == key:
+                    return _Bucket(key_hash, node.pairs[:i] + ((key, value),) + node.pairs[i + 1:]), False
+            return _Bucket(key_hash, node.pairs + ((key, value),)), True
+        branch = [None] * _WIDTH
+        branch[(node.key_hash >> shift) & _MASK] = node
+        node = tuple(branch)
+    index = (key_hash >> shift) & _MASK
+    child, added = _assoc(node[index], shift + _BITS, key_hash, key, value)
+    return node[:index] + (child,) + node[index + 1:], added
+
+class PersistentMap(Mapping):
+    """Immutable insertion-ordered map backed by a hash array mapped trie."""
+    __slots__ = ('_root', '_keys')
+
+    def __init__(self, items: Any = ()):
+        self._root, self._keys = None, PersistentVector()
+        pairs = items.items() if isinstance(items, Mapping) else items
+        for key, value in pairs:
+            self._root, added = _assoc(self._root, 0, hash(key), key, value)
+            if added:
+                self._keys = self._keys.append(key)
+
+    def set(self, key: Hashable, value: Any) -> 'PersistentMap':
+        """Return a new map with key bound to value."""
+        new_map = PersistentMap.__new__(PersistentMap)
+        new_map._root, added = _assoc(self._root, 0, hash(key), key, value)
+        new_map._keys = self._keys.append(key) if added else self._keys
+        return new_map
+
+    def __getitem__(self, key: Hashable) -> Any:
+        key_hash, node, shift = hash(key), self._root, 0
+        while node is not None:
+            if isinstance(node, _Bucket):
+                if node.key_hash == key_hash:
+                    for existing, value in node.pairs:
+                        if existing == key:
+                            return value
+                break
+            node = node[(key_hash >> shift) & _MASK]
+            shift += _BITS
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({dict(self)!r})"
@@ -0,0 +1,50 @@
+from typing import Dict, Iterable, Optional, Tuple
+import common_path
+from categories import registry
+
+GRANULARITIES = ('day', 'month', 'year')
+
+def transaction_periods(date: str) -> Dict[str, Tuple[int, ...]]:
+    """Split a YYYY-MM-DD date into its day, month and year period keys."""
+    year, month, day = (int(part) for part in date.split('-'))
+    return {'day': (year, month, day), 'month': (year, month), 'year': (year,)}
+
+def empty_rollup() -> Dict:
+    """Create an empty rollup index."""
+    return {granularity: {} for granularity in GRANULARITIES}
+
+def update_rollup(rollup: Dict, transaction: Dict) -> Dict:
+    """Add an expense to the (period, category ID) totals at every granularity."""
+    if transaction['type'] != 'expense':
+        return rollup
+    return add_expense(rollup, transaction['category_id'], transaction_periods(transaction['date'])['day'], transaction['amount'])
+
+def add_expense(rollup: Dict, category_id: int, day: Tuple[int, int, int], amount: int) -> Dict:
+    """Add spending to a category's totals for a (year, month, day) and the month and year holding it."""
+    year, month, _ = day
+    for granularity, period in (('day', day), ('month', (year, month)), ('year', (year,))):
+        totals = rollup[granularity].setdefault(period, {})
+        totals[category_id] = totals.get(category_id, 0) + amount
+    return rollup
+
+def build_rollup(transactions: Iterable[Dict]) -> Dict:
+    """Build a day/month/year rollup index in a single pass."""
+    rollup = empty_rollup()
+    for transaction in transactions:
+        update_rollup(rollup, transaction)
+    return rollup
+
+def latest_period(rollup: Dict, granularity: str) -> Optional[Tuple[int, ...]]:
+    """Get the most recent period with any spending, or None for an empty rollup."""
+    return max(rollup[granularity], default=None)
+
+def period_summary(rollup: Dict, granularity: str, period: Tuple[int, ...]) -> Dict[str, int]:
+    """Get the spending summary by category for one period."""
+    return {registry.names[category_id]: amount for category_id, amount in rollup[granularity].get(period, {}).items()}
+
+def compare_periods(rollup: Dict, granularity: str, current: Tuple[int, ...], previous: Tuple[int, ...]) -> Dict[str, int]:
+    """Compare category spending between two periods of the same granularity."""
+    current_summary = rollup[granularity].get(current, {})
+    previous_summary = rollup[granularity].get(previous, {})
+    return {registry.names[category_id]: amount - previous_summary.get(category_id, 0)
+            for category_id, amount in current_summary.items()}
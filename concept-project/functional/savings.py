@@ -1,6 +1,7 @@
-from typing import List, Dict
+from typing import Dict, Iterable
+from persistent import PersistentVector
 
-def set_savings_goal(goals: List[Dict], target: float, months: int) -> List[Dict]:
+def set_savings_goal(goals: Iterable[Dict], target: float, months: int) -> PersistentVector:
     """Define a savings goal and calculate monthly savings."""
     if months <= 0:
         raise ValueError("Months must be greater than 0.")
@@ -12,7 +13,8 @@ def set_savings_goal(goals: List[Dict], target: float, months: int) -> List[Dict
         'months_remaining': months
     }
     
-    return goals + [goal]
+    saved_goals = goals if isinstance(goals, PersistentVector) else PersistentVector(goals)
+    return saved_goals.append(goal)
 
 def display_savings_goal_details(goal: Dict) -> str:
     """Display the detailed savings goal information."""
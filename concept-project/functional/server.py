@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import common_path
+import instrument
+import memo
+from analytics import spending_summary, overall_spending, spending_between, monthly_spending_trends
+from budget import set_budget, track_budget_usage, budget_alert
+from date_index import build_date_index, extend_date_index, has_pending, merge_pending, transactions_between
+from ingest import convert_fields, new_report, record_error
+from jsonrpc import INVALID_PARAMS, JsonRpcServer, RequestError
+from memo import cached_call
+from persistent import PersistentVector, PersistentMap
+from storage import open_ledger, load_transactions, save_transactions
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+LEDGER_PATH = 'ledger.db'
+
+def transaction_record(transaction: Dict) -> Dict:
+    """Drop the process-local category ID before a transaction leaves the server."""
+    return {'amount': transaction['amount'], 'category': transaction['category'], 'date': transaction['date'], 'type': transaction['type']}
+
+class LedgerServer(JsonRpcServer):
+    """Serve a ledger to many concurrent clients from an asyncio event loop.
+
+    The ledger and budgets are persistent values, replaced rather than changed, so reports
+    that scan the whole ledger run on the executor over the version current when they were
+    asked for. Writes are queued and applied together once per loop pass: one extend, one
+    SQLite transaction. Writes wait for reports in progress to finish, since the date index is
+    updated in place and forked report workers copy whatever the process holds at the time.
+    With more than one worker, whole-ledger reports take turns on an executor of their own,
+    leaving the shared one free for range queries.
+    """
+
+    def __init__(self, ledger, transactions: PersistentVector, workers: int = 1, executor: Optional[ThreadPoolExecutor] = None):
+        super().__init__()
+        self.ledger = ledger
+        self.transactions = transactions
+        self.budgets = PersistentMap()
+        self.workers = workers
+        self.executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix='ledger-report')
+        self.process_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ledger-process-report') if workers > 1 else self.executor
+        self.date_index, self.indexed = None, None
+        self.methods = {
+            'count': (self.count, 'inline'),
+            'budgets': (self.get_budgets, 'inline'),
+            'set_budget': (self.set_budget, 'inline'),
+            'cache_stats': (memo.stats, 'inline'),
+            'add_transaction': (self.add_transaction, 'write'),
+            'add_transactions': (self.add_transactions, 'write'),
+            'spending_summary': (self.spending_summary, 'snapshot'),
+            'overall_spending': (self.overall_spending, 'snapshot'),
+            'track_budget_usage': (self.track_budget_usage, 'snapshot'),
+            'budget_alerts': (self.budget_alerts, 'snapshot'),
+            'transactions_between': (self.transactions_between, 'index'),
+            'spending_between': (self.spending_between, 'index'),
+            'monthly_spending_trends': (self.monthly_spending_trends, 'index'),
+        }
+        self._index_readers = 0
+
+    # Inline methods, answered on the loop
+
+    def count(self) -> int:
+        return len(self.transactions)
+
+    def get_budgets(self) -> Dict[str, int]:
+        return dict(self.budgets.items())
+
+    def set_budget(self, category: str, amount: float) -> bool:
+        self.budgets = set_budget(self.budgets, category, amount)
+        return True
+
+    # Writes, validated on the loop and queued for the next flush
+
+    def add_transaction(self, amount: Any, category: Any, date: Any, type: Any) -> Tuple[List[Dict], bool]:
+        return [convert_fields(amount, category, date, type)], True
+
+    def add_transactions(self, rows: List[List]) -> Tuple[List[Dict], Dict]:
+        """Validate a list of [amount, category, date, type] rows, queueing the valid ones."""
+        if not isinstance(rows, list):
+            raise RequestError(INVALID_PARAMS, "rows must be an array of [amount, category, date, type] rows")
+        report = new_report()
+        valid = []
+        for number, row in enumerate(rows, 1):
+            report['rows'] += 1
+            if not (isinstance(row, list) and len(row) == 4):
+                record_error(report, number, row, ValueError("expected [amount, category, date, type]"))
+                continue
+            try:
+                valid.append(convert_fields(*row))
+            except (TypeError, ValueError) as e:
+                record_error(report, number, row, e)
+        return valid, {'added': len(valid), 'rejected': report['rejected'], 'errors': report['errors']}
+
+    # Reports over a snapshot of the ledger, run on the executor and memoized per ledger version
+
+    def spending_summary(self, transactions: PersistentVector, budgets: PersistentMap) -> Dict[str, int]:
+        return cached_call(spending_summary, transactions, self.workers)
+
+    def overall_spending(self, transactions: PersistentVector, budgets: PersistentMap) -> int:
+        return cached_call(overall_spending, transactions, self.workers)
+
+    def track_budget_usage(self, transactions: PersistentVector, budgets: PersistentMap) -> Dict[str, int]:
+        return cached_call(track_budget_usage, budgets, transactions, self.workers)
+
+    def budget_alerts(self, transactions: PersistentVector, budgets: PersistentMap) -> List[str]:
+        return cached_call(budget_alert, budgets, self.track_budget_usage(transactions, budgets))
+
+    # Range reports over the date index, run on the executor; the index changes in place, so
+    # the ledger version it was read at keys the memoized results
+
+    def transactions_between(self, index: Dict, transactions: PersistentVector, start: str, end: str,
+                             category: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return cached_call(_transaction_records, index, start, end, category, limit, version=transactions)
+
+    def spending_between(self, index: Dict, transactions: PersistentVector, start: str, end: str, category: Optional[str] = None) -> Dict[str, int]:
+        return cached_call(spending_between, index, start, end, category, version=transactions)
+
+    def monthly_spending_trends(self, index: Dict, transactions: PersistentVector, year: int, month: int) -> Dict[str, int]:
+        return cached_call(monthly_spending_trends, index, year, month, version=transactions)
+
+    # Scheduling
+
+    def apply_writes(self, rows: List[Dict]) -> None:
+        save_transactions(self.ledger, rows)
+        updated = self.transactions.extend(rows)
+        if self.indexed is self.transactions:
+            # Queued on the index and merged by the next range query, off the loop
+            extend_date_index(self.date_index, rows)
+            self.indexed = updated
+        self.transactions = updated
+
+    async def dispatch(self, kind: str, function: Callable, args: List, kwargs: Dict) -> Any:
+        if kind == 'snapshot':
+            async with self.reading():
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.process_executor, partial(function, self.transactions, self.budgets, *args, **kwargs))
+        return await self._read_index(function, args, kwargs)
+
+    async def _read_index(self, query: Callable, args: List, kwargs: Dict) -> Any:
+        loop = asyncio.get_running_loop()
+        async with self._state:
+            # Queued writes go first so range queries cannot starve them. Merging added rows changes
+            # the index in place, so that also waits for the range queries still reading it.
+            await self._state.wait_for(lambda: not self._writer_waiting and (
+                self._index_readers == 0 or self.indexed is not self.transactions or not has_pending(self.date_index)))
+            if self.indexed is not self.transactions:
+                # Built once, then kept up to date by each flush
+                self.date_index = await loop.run_in_executor(self.executor, build_date_index, self.transactions)
+                self.indexed = self.transactions
+            elif has_pending(self.date_index):
+                await loop.run_in_executor(self.executor, merge_pending, self.date_index)
+            self._readers += 1
+            self._index_readers += 1
+            index, version = self.date_index, self.indexed
+        try:
+            return await loop.run_in_executor(self.executor, partial(query, index, version, *args, **kwargs))
+        finally:
+            async with self._state:
+                self._readers -= 1
+                self._index_readers -= 1
+                self._state.notify_all()
+
+def _transaction_records(index: Dict, start: str, end: str, category: Optional[str], limit: Optional[int]) -> List[Dict]:
+    found = transactions_between(index, start, end, category)
+    return [transaction_record(t) for t in (found if limit is None else found[:limit])]
+
+async def serve(ledger_server: LedgerServer, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: Optional[str] = None) -> None:
+    server = await ledger_server.start(host, port, unix_path)
+    print(f"Serving {len(ledger_server.transactions)} transactions on {unix_path or f'{host}:{port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        ledger_server.process_executor.shutdown(wait=True)
+        ledger_server.executor.shutdown(wait=True)
+        print(f"Stopped after {ledger_server.requests_served} requests")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ledger over JSON-RPC to local clients.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--ledger', default=LEDGER_PATH, help="SQLite ledger to serve")
+    parser.add_argument('--workers', type=int, default=1, help="processes for whole-ledger reports")
+    options = parser.parse_args()
+
+    instrument.configure_from_environment()
+    memo.configure_from_environment()
+    ledger = open_ledger(options.ledger)
+    ledger_server = LedgerServer(ledger, PersistentVector(load_transactions(ledger)), options.workers)
+    try:
+        asyncio.run(serve(ledger_server, options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ledger.close()
+
+if __name__ == "__main__":
+    main()
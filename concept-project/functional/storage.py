@@ -0,0 +1,128 @@
+import sqlite3
+from datetime import date as Date
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Mapping, Tuple
+from rollup import add_expense, empty_rollup, transaction_periods
+import common_path
+from categories import intern_category, registry
+from instrument import instrumented
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    amount INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (ordinal);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, ordinal);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    prefix_hash TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+
+INSERT_BATCH_SIZE = 10000
+
+def open_ledger(path: str) -> sqlite3.Connection:
+    """Open (or create) an SQLite ledger in WAL mode."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def _to_row(transaction: Dict) -> Tuple:
+    year, month, day = transaction_periods(transaction['date'])['day']
+    ordinal = Date(year, month, day).toordinal()
+    return (transaction['amount'], transaction['category'], transaction['date'], transaction['type'], year, month, day, ordinal)
+
+@instrumented(rows=lambda saved, *args, **kwargs: saved)
+def save_transactions(connection: sqlite3.Connection, transactions: Iterable[Dict]) -> int:
+    """Append transactions to the ledger with batched executemany inserts."""
+    rows = map(_to_row, transactions)
+    saved = 0
+    with connection:
+        while True:
+            batch = list(islice(rows, INSERT_BATCH_SIZE))
+            if not batch:
+                return saved
+            connection.executemany(
+                "INSERT INTO transactions (amount, category, date, type, year, month, day, ordinal) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch)
+            saved += len(batch)
+
+def replace_transactions(connection: sqlite3.Connection, transactions: Iterable[Dict]) -> int:
+    """Replace the stored ledger with the given transactions."""
+    with connection:
+        connection.execute("DELETE FROM transactions")
+        # The manifest described what the old ledger was built from
+        connection.execute("DELETE FROM imports")
+        return save_transactions(connection, transactions)
+
+def load_import_manifest(connection: sqlite3.Connection) -> Dict[str, Dict]:
+    """Load the manifest of previously imported files, keyed by absolute path."""
+    rows = connection.execute("SELECT path, size, mtime_ns, prefix_hash, offset FROM imports")
+    return {row[0]: dict(zip(('path', 'size', 'mtime_ns', 'prefix_hash', 'offset'), row)) for row in rows}
+
+def save_import(connection: sqlite3.Connection, transactions: Iterable[Dict], manifest: Mapping[str, Dict]) -> int:
+    """Append newly imported transactions and record the manifest in one SQLite transaction."""
+    with connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO imports (path, size, mtime_ns, prefix_hash, offset) VALUES (?, ?, ?, ?, ?)",
+            [(entry['path'], entry['size'], entry['mtime_ns'], entry['prefix_hash'], entry['offset']) for entry in manifest.values()])
+        return save_transactions(connection, transactions)
+
+def load_transactions(connection: sqlite3.Connection) -> Iterator[Dict]:
+    """Lazily yield the stored transactions in insertion order."""
+    rows = connection.execute("SELECT amount, category, date, type FROM transactions ORDER BY id")
+    for amount, category, date, transaction_type in rows:
+        yield intern_category({'amount': amount, 'category': category, 'date': date, 'type': transaction_type})
+
+def load_rollup(connection: sqlite3.Connection) -> Dict:
+    """Build a rollup index from per-day SQL aggregates instead of reading every row.
+
+    Each period lists its categories in the order they first appear in the ledger, as a rollup
+    built from the rows would.
+    """
+    rollup = empty_rollup()
+    rows = connection.execute("SELECT category, year, month, day, SUM(amount) FROM transactions WHERE type = 'expense' "
+                              "GROUP BY category, year, month, day ORDER BY MIN(id)")
+    for category, year, month, day, amount in rows:
+        add_expense(rollup, registry.intern(category), (year, month, day), amount)
+    return rollup
+
+def sql_spending_summary(connection: sqlite3.Connection) -> Dict[str, int]:
+    """Generate a spending summary by category with an SQL aggregate."""
+    rows = connection.execute("SELECT category, SUM(amount) FROM transactions WHERE type = 'expense' GROUP BY category ORDER BY MIN(id)")
+    return dict(rows)
+
+def sql_overall_spending(connection: sqlite3.Connection) -> int:
+    """Calculate total spending (only expenses) with an SQL aggregate."""
+    return connection.execute("SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = 'expense'").fetchone()[0]
+
+def sql_monthly_spending(connection: sqlite3.Connection) -> Dict[Tuple[int, int], float]:
+    """Sum expenses per (year, month) with an SQL aggregate."""
+    rows = connection.execute("SELECT year, month, SUM(amount) FROM transactions WHERE type = 'expense' GROUP BY year, month ORDER BY year, month")
+    return {(year, month): total for year, month, total in rows}
+
+def sql_track_budget_usage(connection: sqlite3.Connection, budgets: Mapping[str, int]) -> Dict[str, int]:
+    """Track the spending for each budget category with an SQL aggregate."""
+    categories = list(budgets)
+    if not categories:
+        return {}
+    placeholders = ", ".join("?" * len(categories))
+    rows = connection.execute(
+        f"SELECT category, SUM(amount) FROM transactions WHERE type = 'expense' AND category IN ({placeholders}) GROUP BY category",
+        categories)
+    spending = dict(rows)
+    return {category: spending.get(category, 0) for category in categories}
@@ -1,60 +1,140 @@
-import csv
-import json
-from typing import List, Dict
+import mmap
+import struct
+from itertools import islice
+from operator import itemgetter
+from typing import List, Dict, Iterable, Iterator, Optional
+from persistent import PersistentVector
+import common_path
+from money import to_cents
+from categories import intern_category
+from instrument import instrumented, rows_in_argument, rows_returned
+from streams import EXPORT_FIELDS, export_stream, open_text, text_format
+from ingest import convert_record, iter_parsed, new_report
+from parsing import DEFAULT_CHUNK_SIZE, column_map
 
-def record_transaction(transactions: List[Dict], amount: float, category: str, date: str, transaction_type: str) -> List[Dict]:
+# Transaction dicts hold 'amount' as integer cents; files store decimal currency units.
+# Categories are interned on the way in, adding an in-memory 'category_id' that is never written out.
+
+# Binary ledger layout: header, category string table, then 8-byte aligned columns
+# amounts (int64 cents), dates (datetime64[D]), category codes (int32) and is_expense flags (bool).
+LEDGER_MAGIC = b'FLEDGER2'
+LEDGER_HEADER = struct.Struct('<8sIQ')  # magic, category count, row count
+
+# The fields a text export writes, in its column order
+export_fields = itemgetter(*EXPORT_FIELDS)
+
+def record_transaction(transactions: Iterable[Dict], amount: float, category: str, date: str, transaction_type: str) -> PersistentVector:
     """Record a new transaction (income or expense)."""
-    new_transaction = {'amount': amount, 'category': category, 'date': date, 'type': transaction_type}
-    return transactions + [new_transaction]
-
-def import_transactions(file_path: str) -> List[Dict]:
-    """Import transactions from a file (CSV or JSON)."""
-    if file_path.endswith('.csv'):
-        return import_transactions_from_csv(file_path)
-    elif file_path.endswith('.json'):
-        return import_transactions_from_json(file_path)
+    new_transaction = intern_category({'amount': to_cents(amount), 'category': category, 'date': date, 'type': transaction_type})
+    ledger = transactions if isinstance(transactions, PersistentVector) else PersistentVector(transactions)
+    return ledger.append(new_transaction)
+
+@instrumented(rows=rows_returned)
+def import_transactions(file_path: str, report: Optional[Dict] = None) -> List[Dict]:
+    """Import transactions from a file (CSV, JSON or JSON Lines, optionally .gz/.xz compressed, or LEDGER).
+
+    Rows that fail to parse are skipped and recorded in report, if one is given.
+    """
+    if file_path.endswith('.ledger'):
+        return import_transactions_from_binary(file_path)
+    file_format = text_format(file_path)
+    if file_format == '.csv':
+        return import_transactions_from_csv(file_path, report)
+    elif file_format in ('.json', '.jsonl'):
+        return import_transactions_from_json(file_path, report)
     else:
-        raise ValueError("Unsupported file type. Please use CSV or JSON.")
+        raise ValueError("Unsupported file type. Please use CSV, JSON, JSONL or LEDGER.")
 
-def import_transactions_from_csv(file_path: str) -> List[Dict]:
+def import_transactions_from_csv(file_path: str, report: Optional[Dict] = None) -> List[Dict]:
     """Import transactions from a CSV file."""
-    with open(file_path, newline='', mode='r') as file:
-        reader = csv.DictReader(file)
-        return [{**row, 'amount': float(row['amount']), 'type': row['type']} for row in reader]
-
-def import_transactions_from_json(file_path: str) -> List[Dict]:
-    """Import transactions from a JSON file."""
-    try:
-        with open(file_path, mode='r') as file:
-            transactions = json.load(file)
-            return [{**transaction, 'amount': float(transaction['amount']), 'type': transaction['type']} for transaction in transactions if isinstance(transaction, dict)]
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
-        return []
-    except FileNotFoundError:
-        print(f"Error: File not found - {file_path}")
-        return []
-    except Exception as e:
-        print(f"An error occurred while importing JSON: {e}")
-        return []
-
-def export_transactions(file_path: str, transactions: List[Dict]) -> None:
-    """Export transactions to a file (CSV or JSON)."""
-    if file_path.endswith('.csv'):
-        export_transactions_to_csv(file_path, transactions)
-    elif file_path.endswith('.json'):
-        export_transactions_to_json(file_path, transactions)
+    return list(iter_transactions(file_path, report=report))
+
+def import_transactions_from_json(file_path: str, report: Optional[Dict] = None) -> List[Dict]:
+    """Import transactions from a JSON file in either the list or the {"transactions": [...]} layout.
+
+    A file that cannot be read or decoded raises, so callers never mistake it for an empty one.
+    """
+    return list(iter_transactions(file_path, report=report))
+
+def iter_transactions(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, report: Optional[Dict] = None) -> Iterator[Dict]:
+    """Lazily yield transactions from a CSV, JSON or JSON Lines file, optionally .gz/.xz compressed.
+
+    The layout is sniffed from the content, so both JSON schemas are read, and JSON arrays are
+    decoded incrementally, chunk_size characters at a time. Bad rows are skipped and recorded in report.
+    """
+    if not text_format(file_path):
+        raise ValueError("Unsupported file type. Please use CSV, JSON or JSONL.")
+    with open_text(file_path) as file:
+        yield from iter_parsed(file, report if report is not None else new_report(file_path), chunk_size)
+
+def iter_transaction_batches(file_path: str, batch_size: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """Lazily yield lists of at most batch_size transactions from a CSV or JSON file."""
+    transactions = iter_transactions(file_path, chunk_size)
+    while True:
+        batch = list(islice(transactions, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def parse_transaction(row: Dict) -> Dict:
+    """Convert a decoded row with amount, category, date and type keys in any case, raising ValueError if it is invalid."""
+    return convert_record(row, column_map(row))
+
+@instrumented(rows=rows_in_argument(1))
+def export_transactions(file_path: str, transactions: Iterable[Dict]) -> None:
+    """Export transactions to a file (CSV, JSON or JSON Lines, optionally .gz/.xz compressed, or LEDGER)."""
+    if file_path.endswith('.ledger'):
+        export_transactions_to_binary(file_path, transactions)
     else:
-        raise ValueError("Unsupported file type. Please use CSV or JSON.")
+        export_stream(file_path, transactions, export_fields)
 
-def export_transactions_to_csv(file_path: str, transactions: List[Dict]) -> None:
+def export_transactions_to_csv(file_path: str, transactions: Iterable[Dict]) -> None:
     """Export transactions to a CSV file."""
-    with open(file_path, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=transactions[0].keys())
-        writer.writeheader()
-        writer.writerows(transactions)
+    export_stream(file_path, transactions, export_fields)
 
-def export_transactions_to_json(file_path: str, transactions: List[Dict]) -> None:
+def export_transactions_to_json(file_path: str, transactions: Iterable[Dict]) -> None:
     """Export transactions to a JSON file."""
-    with open(file_path, mode='w') as file:
-        json.dump(transactions, file, indent=4)
+    export_stream(file_path, transactions, export_fields)
+
+def export_transactions_to_binary(file_path: str, transactions: Iterable[Dict]) -> None:
+    """Export transactions to a columnar binary ledger file."""
+    # frame needs NumPy, so it is only imported when the binary format is used
+    from frame import frame_from_transactions
+    frame = frame_from_transactions(transactions)
+    with open(file_path, mode='wb') as file:
+        file.write(LEDGER_HEADER.pack(LEDGER_MAGIC, len(frame.categories), len(frame.amounts)))
+        for category in frame.categories:
+            encoded = category.encode('utf-8')
+            file.write(struct.pack('<I', len(encoded)) + encoded)
+        file.write(b'\0' * (-file.tell() % 8))
+        for column, dtype in ((frame.amounts, '<i8'), (frame.dates, '<M8[D]'), (frame.category_codes, '<i4'), (frame.is_expense, '?')):
+            file.write(column.astype(dtype, copy=False).tobytes())
+
+def load_binary_frame(file_path: str):
+    """Memory-map a binary ledger file as a TransactionFrame without copying its columns."""
+    import numpy as np
+    from frame import TransactionFrame
+    with open(file_path, mode='rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, category_count, row_count = LEDGER_HEADER.unpack_from(buffer, 0)
+    if magic != LEDGER_MAGIC:
+        raise ValueError(f"Not a binary ledger file: {file_path}")
+    offset = LEDGER_HEADER.size
+    categories = []
+    for _ in range(category_count):
+        (length,) = struct.unpack_from('<I', buffer, offset)
+        categories.append(bytes(buffer[offset + 4:offset + 4 + length]).decode('utf-8'))
+        offset += 4 + length
+    offset += -offset % 8
+    columns = []
+    for dtype in ('<i8', '<M8[D]', '<i4', '?'):
+        column = np.frombuffer(buffer, dtype=dtype, count=row_count, offset=offset)
+        columns.append(column)
+        offset += column.nbytes
+    amounts, dates, category_codes, is_expense = columns
+    return TransactionFrame(tuple(categories), category_codes, amounts, dates, is_expense)
+
+def import_transactions_from_binary(file_path: str) -> List[Dict]:
+    """Import transactions from a binary ledger file."""
+    from frame import frame_to_transactions
+    return frame_to_transactions(load_binary_frame(file_path))
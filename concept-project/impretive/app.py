@@ -1,11 +1,27 @@
 # app.py
+import logging
 import tkinter as tk
+import common_path
+import instrument
 from gui import FinanceApp
+from logs import format_event
+from manager import FinanceManager
+from storage import SQLiteStorage
+
+LEDGER_PATH = "ledger.db"
+STATS_PATH = "instrumentation.json"
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    # Set FINANCE_INSTRUMENT=1 (or =memory) to record per-method stats, written out on exit
+    instrument.configure_from_environment()
     root = tk.Tk()
-    app = FinanceApp(root)
+    app = FinanceApp(root, FinanceManager(SQLiteStorage(LEDGER_PATH)))
     root.mainloop()
+    logging.getLogger(__name__).info(format_event("analytics_cache", **app.manager.cache.stats()))
+    if instrument.is_enabled():
+        instrument.dump_stats(STATS_PATH)
+        logging.getLogger(__name__).info(format_event("instrumentation_dumped", path=STATS_PATH))
 
 if __name__ == "__main__":
     main()
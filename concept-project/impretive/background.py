@@ -0,0 +1,64 @@
+import io
+from collections import Counter
+from incremental import transaction_key
+from transaction import export_transactions
+from ingest import iter_parsed_rows
+import common_path
+from file_changes import read_file_changes
+from instrument import instrumented
+
+BATCH_SIZE = 1000
+
+# Workers run off the Tk thread and only talk to the UI through task_queue.
+# Messages are (kind, payload, fraction) tuples:
+#   ('changes', (status, duplicates), 0.0)                     what changed since the last import, and for a
+#                                                              new or rewritten file the ledger's transaction keys
+#   ('rows', [(cents, category, date, type), ...], fraction)   validated rows for the UI to add
+#   ('report', import_report, 1.0)                             rows read and rejected by an import
+#   ('progress', row_count, fraction)                          rows written by an export
+#   ('done', manifest_entry, 1.0) or ('error', exception, None) sent once at the end
+
+@instrumented()
+def import_worker(file_path, manifest_entry, ledger, report, task_queue):
+    """Parse what changed in a CSV or JSON file in either layout and hand its valid rows to the UI in batches.
+
+    ledger is a snapshot of the transactions, read only if the file has to be checked for rows already imported.
+    Rejected rows are recorded in report, an ImportReport the UI holds, before the batch after them is sent.
+    """
+    try:
+        status, text, manifest_entry = read_file_changes(file_path, manifest_entry)
+        # Rows of new or rewritten files may already be in the ledger; counting its keys reads every row, so not on the Tk thread
+        duplicates = Counter(map(transaction_key, ledger)) if status in ('new', 'rewritten') else None
+        task_queue.put(('changes', (status, duplicates), 0.0))
+        stream = io.StringIO(text)
+        text_size = len(text) or 1
+        batch = []
+        for row in iter_parsed_rows(stream, report):
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                task_queue.put(('rows', batch, min(stream.tell() / text_size, 1.0)))
+                batch = []
+        task_queue.put(('rows', batch, 1.0))
+        task_queue.put(('report', report, 1.0))
+        task_queue.put(('done', manifest_entry, 1.0))
+    except Exception as e:
+        task_queue.put(('error', e, None))
+
+@instrumented(rows=lambda result, *args, **kwargs: result or 0)
+def export_worker(file_path, transactions, total, task_queue):
+    """Stream a snapshot of the transactions to a CSV, JSON or JSON Lines file, reporting progress.
+
+    transactions may be any iterable, such as a storage snapshot; total is only used for the progress fraction.
+    """
+    try:
+        written = [0]
+
+        def progress(rows):
+            written[0] += rows
+            task_queue.put(('progress', rows, min(written[0] / (total or 1), 1.0)))
+
+        export_transactions(file_path, transactions, progress)
+        task_queue.put(('done', None, 1.0))
+        return written[0]
+    except Exception as e:
+        task_queue.put(('error', e, None))
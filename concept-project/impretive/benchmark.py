@@ -0,0 +1,100 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+from datetime import date
+import common_path
+from benchmark_report import REGRESSION_THRESHOLD, compare_files, suite_report, time_case
+from manager import FinanceManager
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+CATEGORIES = ['Food', 'Rent', 'Utilities', 'Transport', 'Entertainment', 'Health', 'Salary']
+
+def synthetic_rows(rows, categories=len(CATEGORIES), start='2024-01-01', days=365, income_ratio=0.1, seed=0):
+    """Yield reproducible (amount, category, date, transaction_type) rows as an import would.
+
+    Categories are drawn with a skewed distribution, dates uniformly from the span,
+    and expenses are mostly small with a long tail while incomes are larger.
+    """
+    generator = random.Random(seed)
+    names = (CATEGORIES + [f"Category {n}" for n in range(len(CATEGORIES), categories)])[:categories]
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    first_day = date.fromisoformat(start).toordinal()
+    for _ in range(rows):
+        is_income = generator.random() < income_ratio
+        amount = generator.lognormvariate(11, 0.5) if is_income else generator.lognormvariate(7.5, 1.2)
+        yield (f"{max(1, int(amount)) / 100:.2f}", generator.choices(names, weights)[0],
+               date.fromordinal(first_day + generator.randrange(days)).isoformat(), 'income' if is_income else 'expense')
+
+def suite_cases(rows, directory):
+    """Build the named FinanceManager benchmark cases for one set of rows, in the order they must run."""
+    manager = FinanceManager()
+    # Time the reports themselves rather than hits on their memoized results
+    manager.cache.resize(0)
+    manager.add_transactions_bulk(rows)
+    for category in {row[1] for row in rows}:
+        manager.set_budget(category, 1000)
+    last_transaction = max(manager.transactions, key=lambda t: t.ordinal)
+    current_period = (last_transaction.year, last_transaction.month)
+    previous_period = (current_period[0], current_period[1] - 1) if current_period[1] > 1 else (current_period[0] - 1, 12)
+
+    return {
+        'manager.add_transactions_bulk': lambda: FinanceManager().add_transactions_bulk(rows),
+        'manager.generate_report': manager.generate_report,
+        'manager.generate_monthly_report': manager.generate_monthly_report,
+        'manager.spending_insights': manager.spending_insights,
+        'manager.compare_periods': lambda: manager.compare_periods('month', current_period, previous_period),
+        'manager.spending_between': lambda: manager.spending_between(f"{current_period[0]}-{current_period[1]:02d}-01", last_transaction.date),
+        'manager.transactions_between': lambda: manager.transactions_between(f"{current_period[0]}-{current_period[1]:02d}-01", last_transaction.date, CATEGORIES[0]),
+        'manager.get_previous_month_category_spending': lambda: manager.get_previous_month_category_spending(CATEGORIES[0], current_period[1]),
+        'manager.track_budget': manager.track_budget,
+        'manager.export_report': lambda: manager.export_report(os.path.join(directory, 'report.csv'))
+    }
+
+def run_suite(sizes, categories=len(CATEGORIES), days=365, income_ratio=0.1, seed=0, repeat=None, cases=None):
+    """Time every benchmark case at every ledger size and return a JSON-serialisable report."""
+    results = []
+    for size in sizes:
+        rows = list(synthetic_rows(size, categories, days=days, income_ratio=income_ratio, seed=seed))
+        # Small ledgers are timed several times to smooth out noise
+        runs = repeat or max(1, min(5, 100_000 // size))
+        with tempfile.TemporaryDirectory() as directory:
+            for name, case in suite_cases(rows, directory).items():
+                if cases and not any(name.startswith(prefix) for prefix in cases):
+                    continue
+                # export_report prints a confirmation; keep it out of the output
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds = time_case(case, runs)
+                results.append({'benchmark': name, 'rows': size, 'seconds': seconds, 'ns_per_row': seconds / size * 1e9})
+                print(f"{name:<48} {size:>10} {seconds:>10.4f}s", file=sys.stderr)
+    config = {'sizes': sizes, 'categories': categories, 'days': days, 'income_ratio': income_ratio, 'seed': seed, 'repeat': repeat}
+    return suite_report(config, results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the FinanceManager ingestion and report methods.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--categories', type=int, default=len(CATEGORIES))
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--income-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int)
+    parser.add_argument('--only', nargs='+', help="run only cases whose names start with these prefixes")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two reports instead of running")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    options = parser.parse_args()
+
+    if options.compare:
+        sys.exit(compare_files(options.compare[0], options.compare[1], options.threshold))
+
+    report = run_suite(options.sizes, options.categories, options.days, options.income_ratio, options.seed, options.repeat, options.only)
+    with open(options.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {len(report['results'])} results to {options.output}")
+
+if __name__ == "__main__":
+    main()
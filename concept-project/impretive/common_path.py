@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Modules both frontends share live in ../common. Importing this module puts that directory
+# on the import path, so it goes before any import of a shared module.
+COMMON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'common')
+
+if COMMON_DIR not in sys.path:
+    sys.path.append(COMMON_DIR)
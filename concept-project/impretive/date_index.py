@@ -0,0 +1,124 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from operator import attrgetter
+from datetime import date
+import common_path
+from parsing import parse_date
+
+def date_ordinal(value):
+    """Turn a YYYY-MM-DD string or a date into its proleptic ordinal."""
+    if isinstance(value, str):
+        return parse_date(value).toordinal()
+    return value.toordinal()
+
+def month_range(year, month):
+    """Return the first and last date of a month as ordinals."""
+    first = date(year, month, 1)
+    following = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first.toordinal(), following.toordinal() - 1
+
+_ordinal = attrgetter('ordinal')
+
+class PostingList:
+    """Transactions kept in date order next to a parallel array of their ordinals for bisect.
+
+    Added transactions wait in a pending list and are merged in on the next query, so a bulk
+    import of many batches pays for one merge rather than one per batch.
+    """
+
+    def __init__(self):
+        self.ordinals = []
+        self.transactions = []
+        self.pending = []
+
+    def __len__(self):
+        return len(self.transactions) + len(self.pending)
+
+    def add(self, transaction):
+        self.pending.append(transaction)
+
+    def add_many(self, transactions):
+        self.pending.extend(transactions)
+
+    def _merge_pending(self):
+        if not self.pending:
+            return
+        batch = sorted(self.pending, key=_ordinal)
+        self.pending = []
+        if self.ordinals and batch[0].ordinal < self.ordinals[-1]:
+            # Two sorted runs, which the sort merges in linear time
+            self.transactions.extend(batch)
+            self.transactions.sort(key=_ordinal)
+            self.ordinals = list(map(_ordinal, self.transactions))
+        else:
+            self.transactions.extend(batch)
+            self.ordinals.extend(map(_ordinal, batch))
+
+    def remove(self, transaction):
+        """Remove this very transaction object; equal-looking rows on the same day are left alone."""
+        self._merge_pending()
+        start = bisect_left(self.ordinals, transaction.ordinal)
+        end = bisect_right(self.ordinals, transaction.ordinal, start)
+        for position in range(start, end):
+            if self.transactions[position] is transaction:
+                del self.ordinals[position]
+                del self.transactions[position]
+                return
+        raise ValueError("transaction is not in the index")
+
+    def between(self, start, end):
+        """Return the transactions dated from start to end ordinal inclusive, in date order."""
+        self._merge_pending()
+        low = bisect_left(self.ordinals, start)
+        high = bisect_right(self.ordinals, end, low)
+        return self.transactions[low:high]
+
+class DateIndex:
+    """Date-ordered index over a ledger with a posting list per category.
+
+    Range queries bisect to the first and last matching date, so they cost O(log n + k)
+    for k matching transactions instead of a scan of the whole ledger.
+    """
+
+    def __init__(self, transactions=()):
+        self.all = PostingList()
+        self.categories = defaultdict(PostingList)  # keyed by category ID
+        self.add_many(transactions)
+
+    def __len__(self):
+        return len(self.all)
+
+    def add(self, transaction):
+        self.all.add(transaction)
+        self.categories[transaction.category_id].add(transaction)
+
+    def add_many(self, transactions):
+        transactions = list(transactions)
+        self.all.add_many(transactions)
+        by_category = defaultdict(list)
+        for transaction in transactions:
+            by_category[transaction.category_id].append(transaction)
+        for category_id, batch in by_category.items():
+            self.categories[category_id].add_many(batch)
+
+    def remove(self, transaction):
+        self.all.remove(transaction)
+        postings = self.categories[transaction.category_id]
+        postings.remove(transaction)
+        if not postings:
+            del self.categories[transaction.category_id]
+
+    def between(self, start, end, category_id=None):
+        """Return the transactions dated from start to end inclusive, optionally for one category ID."""
+        if category_id is None:
+            return self.all.between(start, end)
+        postings = self.categories.get(category_id)
+        return postings.between(start, end) if postings is not None else []
+
+    def expense_totals_between(self, start, end, category_id=None):
+        """Sum expenses dated from start to end inclusive by category ID."""
+        totals = defaultdict(int)
+        for transaction in self.between(start, end, category_id):
+            if transaction.transaction_type == 'expense':
+                totals[transaction.category_id] += transaction.amount
+        return totals
@@ -2,13 +2,23 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
 from tkinter import ttk
-import csv
-import json
+import os
+import queue
+import threading
+import time
 from manager import FinanceManager
+from background import import_worker, export_worker
+from ingest import ImportReport
+import common_path
+from money import format_cents
 
 class FinanceApp:
-    def __init__(self, root):
-        self.manager = FinanceManager()
+    PAGE_SIZE = 100  # Rows materialized in the transaction list at a time
+    POLL_INTERVAL_MS = 50  # How often the Tk loop checks on a background import/export
+    MAX_BATCHES_PER_POLL = 5  # Parsed batches added per poll so the window stays responsive
+
+    def __init__(self, root, manager=None):
+        self.manager = manager if manager is not None else FinanceManager()
         self.root = root
         self.root.title("Personal Finance Manager")
         self.root.minsize(600, 500)
@@ -60,6 +70,20 @@ class FinanceApp:
         self.transaction_list.heading("Type", text="Type")
         self.transaction_list.grid(row=5, column=0, columnspan=2, pady=10, sticky='nsew')
 
+        # Paging controls so only one page of the ledger is in the Treeview
+        self.page = 0
+        self.page_frame = ttk.Frame(self.transaction_frame)
+        self.page_frame.grid(row=6, column=0, columnspan=2, pady=5)
+
+        self.previous_page_button = ttk.Button(self.page_frame, text="< Previous", command=lambda: self.show_page(self.page - 1))
+        self.previous_page_button.grid(row=0, column=0, padx=5)
+
+        self.page_label = ttk.Label(self.page_frame, text="Page 1 of 1")
+        self.page_label.grid(row=0, column=1, padx=5)
+
+        self.next_page_button = ttk.Button(self.page_frame, text="Next >", command=lambda: self.show_page(self.page + 1))
+        self.next_page_button.grid(row=0, column=2, padx=5)
+
         # Insights Button
         self.insights_button = ttk.Button(self.main_frame, text="Generate Spending Insights", command=self.show_insights)
         self.insights_button.grid(row=7, column=0, padx=10, pady=10)
@@ -74,6 +98,12 @@ class FinanceApp:
         self.export_button = ttk.Button(self.import_export_frame, text="Export", command=self.export_data)
         self.export_button.grid(row=0, column=1, padx=5, pady=5)
 
+        self.progress_bar = ttk.Progressbar(self.import_export_frame, orient="horizontal", length=200, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=1, column=0, columnspan=2, padx=5, pady=5)
+
+        self.progress_label = ttk.Label(self.import_export_frame, text="")
+        self.progress_label.grid(row=2, column=0, columnspan=2, padx=5)
+
         # Budget Section
         self.budget_frame = ttk.LabelFrame(self.main_frame, text="Budget")
         self.budget_frame.grid(row=1, column=0, padx=10, pady=10, sticky='nsew')
@@ -129,6 +159,9 @@ class FinanceApp:
         self.monthly_savings_result = ttk.Label(self.savings_frame, text="N/A")
         self.monthly_savings_result.grid(row=4, column=0, columnspan=2, pady=5)
 
+        # Show any transactions the manager already holds, e.g. from a stored ledger
+        self.update_transaction_list()
+
     def show_insights(self):
         insights = self.manager.spending_insights()
         insights_text = "\n".join(insights)
@@ -144,11 +177,11 @@ class FinanceApp:
         transaction_type = self.type_entry.get().lower()  # Ensure this is captured
         if amount and category and date and transaction_type in ['income', 'expense']:
             try:
-                amount = float(amount)
+                # to_cents parses the text itself, so amounts are never rounded through a float
                 self.manager.add_transaction(amount, category, date, transaction_type)  # Pass transaction_type
-                self.update_transaction_list()
+                self.show_new_transaction()
             except ValueError:
-                messagebox.showerror("Error", "Invalid amount entered!")
+                messagebox.showerror("Error", "Invalid amount or date entered!")
         else:
             messagebox.showerror("Error", "All fields must be filled and type must be income or expense!")
 
@@ -157,7 +190,6 @@ class FinanceApp:
         limit = self.budget_limit_entry.get()
         if category and limit:
             try:
-                limit = float(limit)
                 self.manager.set_budget(category, limit)
                 self.update_budget_summary()
             except ValueError:
@@ -166,11 +198,35 @@ class FinanceApp:
             messagebox.showerror("Error", "All fields must be filled!")
 
     def update_transaction_list(self):
-        for row in self.transaction_list.get_children():
-            self.transaction_list.delete(row)
+        self.show_page(self.page)
+
+    def page_count(self):
+        return max(1, -(-len(self.manager.transactions) // self.PAGE_SIZE))
+
+    def show_page(self, page):
+        """Redraw the Treeview with only the rows of the given page."""
+        self.page = min(max(page, 0), self.page_count() - 1)
+        self.transaction_list.delete(*self.transaction_list.get_children())
+
+        start = self.page * self.PAGE_SIZE
+        for transaction in self.manager.transactions[start:start + self.PAGE_SIZE]:
+            self.insert_transaction_row(transaction)
+        self.update_page_label()
+
+    def show_new_transaction(self):
+        """Show the most recently added transaction, inserting a single row when its page is on screen."""
+        last_index = len(self.manager.transactions) - 1
+        if last_index // self.PAGE_SIZE == self.page:
+            self.insert_transaction_row(self.manager.transactions[last_index])
+            self.update_page_label()
+        else:
+            self.show_page(last_index // self.PAGE_SIZE)
+
+    def insert_transaction_row(self, transaction):
+        self.transaction_list.insert("", "end", values=(format_cents(transaction.amount), transaction.category, transaction.date, transaction.transaction_type))
 
-        for transaction in self.manager.transactions:
-            self.transaction_list.insert("", "end", values=(transaction.amount, transaction.category, transaction.date, transaction.transaction_type))
+    def update_page_label(self):
+        self.page_label.config(text=f"Page {self.page + 1} of {self.page_count()} ({len(self.manager.transactions)} transactions)")
 
     def update_budget_summary(self):
         budget_summary = self.manager.track_budget()
@@ -178,8 +234,8 @@ class FinanceApp:
         self.budget_summary_text.delete(1.0, tk.END)
         for category, status in budget_summary.items():
             self.budget_summary_text.insert(tk.END, f"Category: {category}\n")
-            self.budget_summary_text.insert(tk.END, f"  Total Spent: {status['total_spent']}\n")
-            self.budget_summary_text.insert(tk.END, f"  Remaining: {status['remaining']}\n")
+            self.budget_summary_text.insert(tk.END, f"  Total Spent: {format_cents(status['total_spent'])}\n")
+            self.budget_summary_text.insert(tk.END, f"  Remaining: {format_cents(status['remaining'])}\n")
             self.budget_summary_text.insert(tk.END, f"  Status: {status['status']}\n\n")
         self.budget_summary_text.config(state='disabled')
 
@@ -192,11 +248,11 @@ class FinanceApp:
 
         self.analytics_report_text.insert(tk.END, "Category Spending:\n")
         for category, total in category_spending.items():
-            self.analytics_report_text.insert(tk.END, f"{category}: {total}\n")
+            self.analytics_report_text.insert(tk.END, f"{category}: {format_cents(total)}\n")
 
         self.analytics_report_text.insert(tk.END, "\nMonthly Spending Breakdown:\n")
         for month, total in monthly_spending.items():
-            self.analytics_report_text.insert(tk.END, f"Month {month}: {total}\n")
+            self.analytics_report_text.insert(tk.END, f"Month {month}: {format_cents(total)}\n")
 
         self.analytics_report_text.config(state='disabled')
 
@@ -221,46 +277,96 @@ class FinanceApp:
         file_type = [("CSV Files", "*.csv"), ("JSON Files", "*.json")]
         file_path = filedialog.askopenfilename(filetypes=file_type)
         if file_path:
-            try:
-                if file_path.endswith('.csv'):
-                    with open(file_path, 'r') as file:
-                        reader = csv.DictReader(file)
-                        for row in reader:
-                            amount = float(row['Amount'])
-                            category = row['Category']
-                            date = row['Date']
-                            transaction_type = row['Type']
-                            self.manager.add_transaction(amount, category, date, transaction_type)
-                elif file_path.endswith('.json'):
-                    with open(file_path, 'r') as file:
-                        data = json.load(file)
-                        for entry in data['transactions']:
-                            amount = entry['Amount']
-                            category = entry['Category']
-                            date = entry['Date']
-                            transaction_type = entry['Type']
-                            self.manager.add_transaction(amount, category, date, transaction_type)
-                self.update_transaction_list()
-                messagebox.showinfo("Success", "Data imported successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to import data: {e}")
+            manifest_entry = self.manager.import_manifest.get(os.path.abspath(file_path))
+            # The worker records rejected rows in the report as it reads them, for the manager to log
+            report = ImportReport(file_path)
+            self.start_background_task("import", import_worker, file_path, manifest_entry, self.ledger_snapshot(), report, report=report)
 
     def export_data(self):
-        file_type = [("CSV Files", "*.csv"), ("JSON Files", "*.json")]
+        file_type = [("CSV Files", "*.csv"), ("JSON Files", "*.json"), ("JSON Lines", "*.jsonl"),
+                     ("Compressed (gzip)", "*.gz"), ("Compressed (xz)", "*.xz")]
         file_path = filedialog.asksaveasfilename(filetypes=file_type, defaultextension=".csv")
         if file_path:
+            self.start_background_task("export", export_worker, file_path, self.ledger_snapshot(), len(self.manager.transactions))
+
+    def ledger_snapshot(self):
+        """Give a worker the ledger as it is now, so rows added meanwhile don't change what it reads.
+
+        A stored ledger is read page by page inside one read transaction instead of copied.
+        """
+        if self.manager.storage is not None:
+            return self.manager.storage.iter_snapshot()
+        return list(self.manager.transactions)
+
+    def start_background_task(self, action, worker, *args, report=None):
+        """Run an import or export worker on a thread and poll its progress from the Tk loop."""
+        self.task_queue = queue.Queue()
+        self.task_action = action
+        self.task_rows = 0
+        self.task_rejected = 0
+        self.task_duplicates = None
+        self.task_report = report
+        self.task_started = time.perf_counter()
+        self.import_button.state(['disabled'])
+        self.export_button.state(['disabled'])
+        self.progress_bar['value'] = 0
+        threading.Thread(target=worker, args=args + (self.task_queue,), daemon=True).start()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_background_task)
+
+    def poll_background_task(self):
+        for _ in range(self.MAX_BATCHES_PER_POLL):
+            try:
+                kind, payload, fraction = self.task_queue.get_nowait()
+            except queue.Empty:
+                break
             try:
-                if file_path.endswith('.csv'):
-                    with open(file_path, 'w', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow(['Amount', 'Category', 'Date', 'Type'])
-                        for transaction in self.manager.transactions:
-                            writer.writerow([transaction.amount, transaction.category, transaction.date, transaction.transaction_type])
-                elif file_path.endswith('.json'):
-                    with open(file_path, 'w') as file:
-                        json_data = {'transactions': [{'Amount': t.amount, 'Category': t.category, 'Date': t.date, 'Type': t.transaction_type} for t in self.manager.transactions]}
-                        json.dump(json_data, file, indent=4)
-                messagebox.showinfo("Success", "Data exported successfully!")
+                if self.handle_task_message(kind, payload):
+                    return
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to export data: {e}")
-
+                # Keep the Tk loop alive and the buttons usable when the ledger can't take the rows, e.g. while locked
+                self.finish_background_task()
+                messagebox.showerror("Error", f"Failed to {self.task_action} data: {e}")
+                return
+            self.progress_bar['value'] = fraction * 100
+        self.update_progress_label()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_background_task)
+
+    def handle_task_message(self, kind, payload):
+        """Apply one message from the background worker; returns True once the task has finished."""
+        if kind == 'changes':
+            # The worker counted the ledger's keys if the file may repeat rows already imported
+            self.task_duplicates = payload[1]
+        elif kind == 'rows':
+            added, _ = self.manager.add_transactions_bulk(payload, duplicates=self.task_duplicates, report=self.task_report, validated=True)
+            self.task_rows += added
+        elif kind == 'report':
+            self.task_rejected += payload.rejected
+        elif kind == 'progress':
+            self.task_rows += payload
+        elif kind == 'done':
+            if payload is not None:
+                self.manager.record_import(payload)
+            self.finish_background_task()
+            if self.task_report is not None and self.task_report.rejected:
+                messagebox.showwarning("Imported with errors", self.task_report.summary())
+            else:
+                messagebox.showinfo("Success", f"Data {self.task_action}ed successfully!")
+            return True
+        elif kind == 'error':
+            self.finish_background_task()
+            messagebox.showerror("Error", f"Failed to {self.task_action} data: {payload}")
+            return True
+        return False
+
+    def finish_background_task(self):
+        self.progress_bar['value'] = 100
+        self.update_progress_label()
+        self.import_button.state(['!disabled'])
+        self.export_button.state(['!disabled'])
+        self.update_transaction_list()
+
+    def update_progress_label(self):
+        elapsed = time.perf_counter() - self.task_started
+        rate = self.task_rows / elapsed if elapsed > 0 else 0
+        rejected = f", {self.task_rejected} rejected" if self.task_rejected else ""
+        self.progress_label.config(text=f"{self.task_action.capitalize()}ed {self.task_rows} rows{rejected} ({rate:.0f} rows/s)")
@@ -0,0 +1,3 @@
+def transaction_key(transaction):
+    """Identify a transaction by its date, amount, category and type for duplicate detection."""
+    return (transaction.date, transaction.amount, transaction.category_id, transaction.transaction_type)
@@ -0,0 +1,55 @@
+import common_path
+from parsing import DEFAULT_CHUNK_SIZE, parse_stream, validate_fields
+
+# Text files are sniffed and decoded by the shared parsing module; this frontend keeps valid
+# rows as (amount in cents, category, YYYY-MM-DD date, type) tuples and counts bad ones in an
+# ImportReport.
+
+MAX_REPORTED_ERRORS = 100
+
+class ImportReport:
+    """Count the rows an import read and rejected, keeping the first few errors."""
+
+    def __init__(self, source=''):
+        self.source = source
+        self.schema = None
+        self.rows = 0
+        self.rejected = 0
+        self.errors = []
+        self.logged = 0  # errors already logged by the manager
+
+    def add_error(self, number, row, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'record': row, 'error': str(error)})
+
+    def reject(self, number, row, error):
+        """Count a row that could not be read and record why."""
+        self.rows += 1
+        self.add_error(number, row, error)
+
+    def summary(self, limit=5):
+        """Summarise the report in a line, followed by up to limit of its errors."""
+        lines = [f"{self.source or 'input'}: {self.rows - self.rejected} of {self.rows} rows valid"
+                 + (f", {self.rejected} rejected" if self.rejected else "")]
+        lines.extend(f"  row {error['row']}: {error['error']}" for error in self.errors[:limit])
+        if self.rejected > limit:
+            lines.append(f"  ... and {self.rejected - limit} more")
+        return "\n".join(lines)
+
+def parse_rows(rows, report, first_number=1):
+    """Validate raw (amount, category, date, type) rows, recording the ones that fail in report."""
+    for number, row in enumerate(rows, first_number):
+        report.rows += 1
+        try:
+            amount, category, date_text, kind = row
+            yield validate_fields(amount, category, date_text, kind)
+        except (TypeError, ValueError) as e:
+            report.add_error(number, row, e)
+
+def iter_parsed_rows(file, report, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Sniff the layout of a text stream and yield its valid rows, recording bad ones in report."""
+    report.schema, rows = parse_stream(file, validate_fields, report.reject, chunk_size)
+    for row in rows:
+        report.rows += 1
+        yield row
@@ -0,0 +1,29 @@
+import logging
+import time
+
+class RateLimitedLogger:
+    """Emit at most one record per interval and report how many were suppressed."""
+
+    def __init__(self, logger, interval=1.0):
+        self.logger = logger
+        self.interval = interval
+        self.last_emitted = None
+        self.suppressed = 0
+
+    def log(self, level, event, **fields):
+        now = time.monotonic()
+        if self.last_emitted is not None and now - self.last_emitted < self.interval:
+            self.suppressed += 1
+            return
+        if self.suppressed:
+            fields['suppressed'] = self.suppressed
+        self.logger.log(level, format_event(event, **fields))
+        self.last_emitted = now
+        self.suppressed = 0
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+def format_event(event, **fields):
+    """Format an event as a single key=value log line."""
+    return " ".join([f"event={event}"] + [f"{key}={value!r}" for key, value in fields.items()])
@@ -1,47 +1,215 @@
 
-import json
-from collections import defaultdict
-from transaction import Transaction
+import io
+import logging
+import os
+from collections import Counter, defaultdict
+from transaction import Transaction, date_periods, export_transactions
+import common_path
+from categories import registry
 from datetime import datetime
+from logs import RateLimitedLogger, format_event
+from money import format_cents, to_cents
+from storage import StoredTransactions
+from incremental import transaction_key
+from file_changes import read_file_changes
+from instrument import instrumented
+from ingest import ImportReport, iter_parsed_rows, parse_rows
+from date_index import DateIndex, date_ordinal
+from memo import ResultCache, max_entries_from_environment, memoized
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 10000
+
+def previous_month_period(period):
+    """Return the (year, month) period before the given one."""
+    year, month = period
+    return (year, month - 1) if month > 1 else (year - 1, 12)
 
 class FinanceManager:
-    def __init__(self):
-        self.transactions = []
+    def __init__(self, storage=None):
+        # With a storage backend the ledger lives on disk and is read on demand
+        self.storage = storage
+        self.transactions = StoredTransactions(storage) if storage is not None else []
         self.savings_goals = []
         self.budgets = []  # To track budgets for different categories
 
+        # Running expense totals in integer cents, kept in step with self.transactions
+        self.category_totals = defaultdict(int)  # keyed by category ID
+        self.monthly_totals = defaultdict(int)  # keyed by (year, month)
+        # Per-category totals for every day, month and year period, e.g. rollups['month'][(2024, 12)][category_id]
+        self.rollups = {'day': {}, 'month': {}, 'year': {}}
+        self._aggregate_counts = defaultdict(int)
+        # Date-ordered index for range queries; a stored ledger uses the ordinal index in SQLite instead
+        self.date_index = DateIndex() if storage is None else None
+        self._rejected_log = RateLimitedLogger(logger)
+        self._bulk_log = RateLimitedLogger(logger)
+        # What has been imported from each file, so re-imports only read what changed
+        self.import_manifest = storage.load_import_manifest() if storage is not None else {}
+        # Bumped by every change to the ledger or budgets; memoized reports are only reused for the version they were computed at
+        self.version = 0
+        self.cache = ResultCache(max_entries_from_environment())
+        if storage is not None:
+            self._load_totals_from_storage()
+
+    @instrumented()
     def add_transaction(self, amount, category, date, transaction_type):
         """Add a new transaction."""
-        transaction = Transaction(amount, category, date, transaction_type)
+        transaction = Transaction(to_cents(amount), category, date, transaction_type)
         self.transactions.append(transaction)
-        print(f"Added transaction: {transaction.amount} | {transaction.category} | {transaction.date} | {transaction.transaction_type}")
+        self._apply_to_totals(transaction, 1)
+        if self.date_index is not None:
+            self.date_index.add(transaction)
+        self.version += 1
+        print(f"Added transaction: {format_cents(transaction.amount)} | {transaction.category} | {transaction.date} | {transaction.transaction_type}")
 
-    def generate_report(self):
-        report = defaultdict(float)
-        for transaction in self.transactions:
+    @instrumented(rows=lambda result, *args, **kwargs: sum(result))
+    def add_transactions_bulk(self, rows, batch_size=BULK_BATCH_SIZE, duplicates=None, report=None, validated=False):
+        """Append rows in batches; every bulk add and import goes through here.
+
+        Raw (amount, category, date, transaction_type) rows are validated first. Rows already
+        validated by the ingest module, as (cents, category, date, type) tuples, are passed with
+        validated=True, their rejections recorded in report as they are read. Rejections not yet
+        logged for report, and a summary of the add, are logged at a limited rate.
+        When a Counter of transaction keys is given as duplicates, one matching row is skipped
+        for each count it holds. Returns (added, rejected) counts.
+        """
+        report = report if report is not None else ImportReport()
+        rejected_before = report.rejected
+        if not validated:
+            rows = parse_rows(rows, report, report.rows + 1)
+        added, skipped = self._add_rows(rows, batch_size, duplicates)
+        for error in report.errors[report.logged:]:
+            self._rejected_log.warning("transaction_rejected", row=error['record'], error=error['error'])
+        report.logged = len(report.errors)
+        self._bulk_log.log(logging.INFO, "bulk_add", added=added, skipped=skipped, total=len(self.transactions))
+        return added, report.rejected - rejected_before
+
+    def _add_rows(self, rows, batch_size, duplicates):
+        """Append validated rows, skipping those matching a count left in duplicates; returns (added, skipped)."""
+        added = skipped = 0
+        batch = []
+        for row in rows:
+            transaction = Transaction(*row)
+            if duplicates is not None and duplicates[transaction_key(transaction)] > 0:
+                duplicates[transaction_key(transaction)] -= 1
+                skipped += 1
+                continue
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                self._append_batch(batch)
+                added += len(batch)
+                batch = []
+        self._append_batch(batch)
+        added += len(batch)
+        return added, skipped
+
+    def _append_batch(self, batch):
+        """Append validated transactions and fold them into the running totals once per key."""
+        self.transactions.extend(batch)
+        if self.date_index is not None:
+            self.date_index.add_many(batch)
+        self.version += 1
+        deltas = defaultdict(lambda: [0, 0])
+        for transaction in batch:
             if transaction.transaction_type == 'expense':  # Only sum expenses
-                report[transaction.category] += transaction.amount
-        return report
+                for scope, key in self._total_keys(transaction.category_id, transaction.year, transaction.month, transaction.day):
+                    delta = deltas[scope, key]
+                    delta[0] += transaction.amount
+                    delta[1] += 1
+        for (scope, key), (amount, count) in deltas.items():
+            self._update_total(scope, key, amount, count)
+
+    @instrumented()
+    def _load_totals_from_storage(self):
+        """Seed the running totals from SQL aggregates instead of reading every row."""
+        for category, year, month, day, amount, count in self.storage.expense_groups():
+            for scope, key in self._total_keys(registry.intern(category), year, month, day):
+                self._update_total(scope, key, amount, count)
+
+    @instrumented()
+    def delete_transaction(self, index):
+        """Remove the transaction at the given position."""
+        transaction = self.transactions.pop(index)
+        self._apply_to_totals(transaction, -1)
+        if self.date_index is not None:
+            self.date_index.remove(transaction)
+        self.version += 1
+        return transaction
+
+    @instrumented()
+    def edit_transaction(self, index, amount, category, date, transaction_type):
+        """Replace the transaction at the given position."""
+        transaction = Transaction(to_cents(amount), category, date, transaction_type)
+        previous = self.transactions[index]
+        self._apply_to_totals(previous, -1)
+        self.transactions[index] = transaction
+        self._apply_to_totals(transaction, 1)
+        if self.date_index is not None:
+            self.date_index.remove(previous)
+            self.date_index.add(transaction)
+        self.version += 1
+        return transaction
 
+    def _apply_to_totals(self, transaction, sign):
+        """Add (sign=1) or remove (sign=-1) an expense from the running totals."""
+        if transaction.transaction_type != 'expense':  # Only sum expenses
+            return
+        for scope, key in self._total_keys(transaction.category_id, transaction.year, transaction.month, transaction.day):
+            self._update_total(scope, key, sign * transaction.amount, sign)
+
+    def _total_keys(self, category_id, year, month, day):
+        """List the (scope, key) of every running total an expense on this date contributes to."""
+        keys = [(('category',), category_id), (('month',), (year, month))]
+        keys.extend(((granularity, period), category_id) for granularity, period in date_periods(year, month, day).items())
+        return keys
+
+    def _update_total(self, scope, key, amount, count):
+        """Adjust one running total and drop it once no expenses remain under its key."""
+        if scope == ('category',):
+            totals = self.category_totals
+        elif scope == ('month',):
+            totals = self.monthly_totals
+        else:
+            granularity, period = scope
+            totals = self.rollups[granularity].setdefault(period, defaultdict(int))
+        totals[key] += amount
+        count_key = scope + (key,)
+        self._aggregate_counts[count_key] += count
+        # Drop keys with no remaining expenses so reports match a full rescan
+        if self._aggregate_counts[count_key] == 0:
+            del totals[key]
+            del self._aggregate_counts[count_key]
+            if len(scope) == 2 and not totals:
+                del self.rollups[scope[0]][scope[1]]
+
+    @instrumented()
+    @memoized
+    def generate_report(self):
+        return defaultdict(int, {registry.names[category_id]: total for category_id, total in self.category_totals.items()})
+
+    @instrumented()
+    @memoized
     def generate_monthly_report(self):
-        monthly_report = defaultdict(float)
-        for transaction in self.transactions:
-            month = datetime.strptime(transaction.date, "%Y-%m-%d").month
-            if transaction.transaction_type == 'expense':  # Only sum expenses
-                monthly_report[month] += transaction.amount
+        monthly_report = defaultdict(int)
+        for (year, month), total in self.monthly_totals.items():
+            monthly_report[month] += total
         return monthly_report
 
+    @instrumented()
     def spending_insights(self):
+        now = datetime.now()
+        return self.insights_for_month((now.year, now.month))
+
+    @memoized
+    def insights_for_month(self, current_period):
+        """Compare spending in the (year, month) current_period with the month before it."""
         insights = []
-        current_month = datetime.now().month
-        current_year = datetime.now().year
+        previous_period = previous_month_period(current_period)
 
-        # Get current month's spending
-        current_month_spending = self.generate_monthly_report().get(current_month, 0)
-        
-        # Get previous month's spending
-        previous_month = current_month - 1 if current_month > 1 else 12
-        previous_month_spending = self.generate_monthly_report().get(previous_month, 0)
+        # Get current and previous month's spending
+        current_month_spending = self.monthly_totals.get(current_period, 0)
+        previous_month_spending = self.monthly_totals.get(previous_period, 0)
 
         # Overall spending trend
         if previous_month_spending > 0:
@@ -49,34 +217,70 @@ class FinanceManager:
             insights.append(f"You spent {'{:.2f}'.format(abs(overall_percentage_change))}% {'more' if overall_percentage_change > 0 else 'less'} this month compared to last month.")
 
         # Category-wise spending insights
-        category_spending = self.generate_report()
-        for category in category_spending.keys():
+        current_category_report = self.rollups['month'].get(current_period, {})
+        previous_category_report = self.rollups['month'].get(previous_period, {})
+        for category_id in self.category_totals.keys():
+            category = registry.names[category_id]
             # Get current and previous month's spending for the category
-            current_category_spending = category_spending[category]
-            previous_category_spending = self.get_previous_month_category_spending(category, current_month)
+            current_category_spending = current_category_report.get(category_id, 0)
+            previous_category_spending = previous_category_report.get(category_id, 0)
 
             if previous_category_spending > 0:
                 category_percentage_change = ((current_category_spending - previous_category_spending) / previous_category_spending) * 100
                 insights.append(f"You spent {'{:.2f}'.format(abs(category_percentage_change))}% {'more' if category_percentage_change > 0 else 'less'} on {category} this month.")
             elif previous_category_spending == 0 and current_category_spending > 0:
-                insights.append(f"You spent ${current_category_spending:.2f} on {category} this month, which is a new expense category for you.")
+                insights.append(f"You spent ${format_cents(current_category_spending)} on {category} this month, which is a new expense category for you.")
             else:
                 insights.append(f"You did not spend on {category} this month.")
 
         return insights
 
+    @instrumented()
+    @memoized
+    def compare_periods(self, granularity, current_period, previous_period):
+        """Compare category spending between two day, month or year periods."""
+        current_report = self.rollups[granularity].get(current_period, {})
+        previous_report = self.rollups[granularity].get(previous_period, {})
+        return {registry.names[category_id]: total - previous_report.get(category_id, 0) for category_id, total in current_report.items()}
 
+    @instrumented()
     def get_previous_month_category_spending(self, category, current_month):
         """Get spending for a specific category from the previous month."""
-        previous_month = current_month - 1 if current_month > 1 else 12
-        previous_month_spending = sum(t.amount for t in self.transactions if 
-                                    t.category == category and 
-                                    datetime.strptime(t.date, "%Y-%m-%d").month == previous_month and 
-                                    datetime.strptime(t.date, "%Y-%m-%d").year == datetime.now().year and 
-                                    t.transaction_type == 'expense')
-        return previous_month_spending
+        previous_period = previous_month_period((datetime.now().year, current_month))
+        return self.rollups['month'].get(previous_period, {}).get(registry.lookup(category), 0)
+
+    @instrumented(rows=lambda result, *args, **kwargs: len(result))
+    def transactions_between(self, start_date, end_date, category=None):
+        """List the transactions dated from start_date to end_date inclusive, in date order.
 
+        Dates are YYYY-MM-DD strings or date objects; category, if given, limits the result to that category.
+        """
+        start, end = date_ordinal(start_date), date_ordinal(end_date)
+        category_id = registry.lookup(category) if category is not None else None
+        if category is not None and category_id is None:
+            return []
+        if self.date_index is not None:
+            return self.date_index.between(start, end, category_id)
+        transactions = self.storage.iter_between(start, end)
+        if category_id is not None:
+            return [t for t in transactions if t.category_id == category_id]
+        return list(transactions)
 
+    @instrumented()
+    @memoized
+    def spending_between(self, start_date, end_date, category=None):
+        """Sum expenses by category for the transactions dated from start_date to end_date inclusive."""
+        if self.date_index is not None:
+            category_id = registry.lookup(category) if category is not None else None
+            if category is not None and category_id is None:
+                return {}
+            totals = self.date_index.expense_totals_between(date_ordinal(start_date), date_ordinal(end_date), category_id)
+        else:
+            totals = defaultdict(int)
+            for transaction in self.transactions_between(start_date, end_date, category):
+                if transaction.transaction_type == 'expense':
+                    totals[transaction.category_id] += transaction.amount
+        return {registry.names[category_id]: total for category_id, total in totals.items()}
 
     def add_savings_goal(self, amount, target_date):
         self.savings_goals.append({
@@ -85,67 +289,63 @@ class FinanceManager:
         })
 
     def set_budget(self, category, limit):
+        category_id = registry.intern(category)
         self.budgets.append({
-            'category': category,
-            'limit': limit
+            'category': registry.names[category_id],
+            'category_id': category_id,
+            'limit': to_cents(limit)
         })
+        self.version += 1
+
+    @instrumented(rows=lambda keys, *args, **kwargs: sum(keys.values()))
+    def existing_transaction_keys(self):
+        """Count the ledger's transactions by date, amount, category and type."""
+        return Counter(map(transaction_key, self.transactions))
 
+    def record_import(self, entry):
+        """Remember how much of a file has been imported."""
+        self.import_manifest[entry['path']] = entry
+        if self.storage is not None:
+            self.storage.save_import_entry(entry)
+
+    @instrumented()
     def import_data(self, file_path):
+        """Import only what is new in a file since it was last imported.
+
+        Unchanged files are skipped, appended CSV files only have their new rows read,
+        and new or rewritten files are read in full with rows already in the ledger skipped.
+        Either JSON layout is accepted. Returns an ImportReport of the rows read and rejected.
+        """
+        report = ImportReport(file_path)
         try:
-            with open(file_path, 'r') as file:
-                if file_path.endswith('.csv'):
-                    reader = csv.reader(file)
-                    next(reader)  # Skip the header row
-                    for row in reader:
-                        if len(row) != 4:
-                            print(f"Skipping invalid row: {row}")
-                            continue
-                        try:
-                            amount, category, date, transaction_type = row
-                            amount = float(amount.strip())
-                            category = category.strip()
-                            self.add_transaction(amount, category, date.strip(), transaction_type.strip())
-                        except ValueError:
-                            print(f"Error converting row: {row}")
-                        except Exception as e:
-                            print(f"Error importing row: {row}. Error: {e}")
-
-                elif file_path.endswith('.json'):
-                    data = json.load(file)
-                    for entry in data['transactions']:
-                        try:
-                            amount = entry.get('Amount')
-                            category = entry.get('Category')
-                            date = entry.get('Date')
-                            transaction_type = entry.get('Type')
-                            if amount is None or category is None or date is None or transaction_type is None:
-                                print(f"Skipping invalid entry: {entry}")
-                                continue
-                            self.add_transaction(amount, category, date, transaction_type)
-                        except KeyError as e:
-                            print(f"Missing key {e} in entry: {entry}")
-                        except Exception as e:
-                            print(f"Error importing entry: {entry}. Error: {e}")
+            if not file_path.endswith(('.csv', '.json')):
+                return report
+            status, text, manifest_entry = read_file_changes(file_path, self.import_manifest.get(os.path.abspath(file_path)))
+            duplicates = self.existing_transaction_keys() if status in ('new', 'rewritten') else None
+            self.add_transactions_bulk(iter_parsed_rows(io.StringIO(text), report), duplicates=duplicates, report=report, validated=True)
+            self.record_import(manifest_entry)
+            if report.rejected:
+                print(report.summary())
         except Exception as e:
             print(f"Failed to open or read file: {file_path}. Error: {e}")
+        return report
 
+    @instrumented(rows=lambda result, manager, *args, **kwargs: len(manager.transactions))
     def export_report(self, file_path):
         try:
-            with open(file_path, 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Amount', 'Category', 'Date', 'Type'])  # Include all transaction details
-                for transaction in self.transactions:
-                    writer.writerow([transaction.amount, transaction.category, transaction.date, transaction.transaction_type])
+            export_transactions(file_path, self.transactions)
             print(f"Report exported successfully to {file_path}")
         except Exception as e:
             print(f"Failed to export report: {e}")
 
+    @instrumented()
+    @memoized
     def track_budget(self):
         budget_status = {}
         for budget in self.budgets:
             category = budget['category']
             limit = budget['limit']
-            total_spent = sum(t.amount for t in self.transactions if t.category == category and t.transaction_type == 'expense')
+            total_spent = self.category_totals.get(budget['category_id'], 0)
             remaining = limit - total_spent
             status = "Under Budget" if remaining >= 0 else "Over Budget"
             budget_status[category] = {
@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+DEFAULT_MAX_ENTRIES = 128
+
+def max_entries_from_environment(default=DEFAULT_MAX_ENTRIES):
+    """Read the cache size from FINANCE_CACHE_SIZE, falling back to default."""
+    setting = os.environ.get('FINANCE_CACHE_SIZE', '')
+    return int(setting) if setting else default
+
+class ResultCache:
+    """Bounded LRU cache of report results, each remembering the ledger version it was computed for.
+
+    A lookup with a newer version is a miss that replaces the stale result, so a mutation
+    invalidates everything computed before it without the cache having to be told.
+    Setting max_entries to 0 turns caching off.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max(0, max_entries)
+        self._entries = OrderedDict()  # call key -> (version, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version, compute):
+        """Return the result cached under key for version, calling compute() to fill it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            if self.max_entries:
+                if key in self._entries:
+                    self.invalidations += 1
+                self._entries[key] = (version, result)
+                self._entries.move_to_end(key)
+                self._evict()
+        return result
+
+    def resize(self, max_entries):
+        with self._lock:
+            self.max_entries = max(0, max_entries)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Return hits, misses, invalidations (misses that replaced a stale result), evictions and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations,
+                    'evictions': self.evictions, 'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+def memoized(method):
+    """Cache a FinanceManager report in the manager's result cache, keyed by its arguments and the ledger version.
+
+    Arguments must be hashable. Results are shared between callers and must not be modified.
+    """
+    @wraps(method)
+    def wrapper(manager, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return manager.cache.get(key, manager.version, lambda: method(manager, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import common_path
+import instrument
+from ingest import ImportReport
+from parsing import validate_fields
+from jsonrpc import INVALID_PARAMS, JsonRpcServer, RequestError
+from logs import format_event
+from manager import FinanceManager
+from storage import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+LEDGER_PATH = "ledger.db"
+
+def transaction_record(transaction):
+    return {'amount': transaction.amount, 'category': transaction.category,
+            'date': transaction.date, 'type': transaction.transaction_type}
+
+class FinanceServer(JsonRpcServer):
+    """Serve one FinanceManager to many concurrent clients from an asyncio event loop.
+
+    Requests are handled in three ways:
+      - cheap reports, answered from the manager's running totals, run inline on the loop;
+      - writes are queued and applied together once per loop pass, as one bulk add;
+      - reports that walk transactions run on the executor, one at a time.
+    The manager is only mutated on the loop thread, and only while no executor report is
+    running, so it never needs locks of its own.
+    """
+
+    def __init__(self, manager, executor=None):
+        super().__init__()
+        self.manager = manager
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='finance-report')
+        self.methods = {
+            'count': (self.count, 'inline'),
+            'generate_report': (manager.generate_report, 'inline'),
+            'generate_monthly_report': (manager.generate_monthly_report, 'inline'),
+            'spending_insights': (manager.spending_insights, 'inline'),
+            'compare_periods': (self.compare_periods, 'inline'),
+            'get_previous_month_category_spending': (manager.get_previous_month_category_spending, 'inline'),
+            'track_budget': (manager.track_budget, 'inline'),
+            'set_budget': (self.set_budget, 'inline'),
+            'cache_stats': (manager.cache.stats, 'inline'),
+            'add_transaction': (self.add_transaction, 'write'),
+            'add_transactions': (self.add_transactions, 'write'),
+            'transactions_between': (self.transactions_between, 'executor'),
+            'spending_between': (manager.spending_between, 'executor'),
+        }
+
+    # Methods that need adapting for JSON
+
+    def count(self):
+        return len(self.manager.transactions)
+
+    def compare_periods(self, granularity, current, previous):
+        return self.manager.compare_periods(granularity, tuple(current), tuple(previous))
+
+    def set_budget(self, category, limit):
+        self.manager.set_budget(category, limit)
+        return True
+
+    def transactions_between(self, start_date, end_date, category=None, limit=None):
+        transactions = self.manager.transactions_between(start_date, end_date, category)
+        return [transaction_record(t) for t in (transactions if limit is None else transactions[:limit])]
+
+    def add_transaction(self, amount, category, date, type):
+        """Validate one row now so its caller gets its own error, and queue it for the next bulk add."""
+        return [validate_fields(amount, category, date, type)], True
+
+    def add_transactions(self, rows):
+        """Validate a list of [amount, category, date, type] rows, queueing the valid ones."""
+        if not isinstance(rows, list):
+            raise RequestError(INVALID_PARAMS, "rows must be an array of [amount, category, date, type] rows")
+        report = ImportReport()
+        valid = []
+        for number, row in enumerate(rows, 1):
+            report.rows += 1
+            if not (isinstance(row, list) and len(row) == 4):
+                report.add_error(number, row, ValueError("expected [amount, category, date, type]"))
+                continue
+            try:
+                valid.append(validate_fields(*row))
+            except (TypeError, ValueError) as e:
+                report.add_error(number, row, e)
+        return valid, {'added': len(valid), 'rejected': report.rejected, 'errors': report.errors}
+
+    # Scheduling
+
+    def apply_writes(self, rows):
+        self.manager.add_transactions_bulk(rows, validated=True)
+
+    async def dispatch(self, kind, function, args, kwargs):
+        async with self.reading():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+async def serve(manager, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+    finance_server = FinanceServer(manager)
+    server = await finance_server.start(host, port, unix_path)
+    where = unix_path or f"{host}:{port}"
+    logger.info(format_event("server_started", address=where, transactions=len(manager.transactions)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        finance_server.executor.shutdown(wait=True)
+        logger.info(format_event("server_stopped", requests=finance_server.requests_served))
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the finance manager over JSON-RPC to local clients.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--ledger', default=LEDGER_PATH, help="SQLite ledger to serve")
+    parser.add_argument('--memory', action='store_true', help="serve an empty in-memory ledger instead")
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    instrument.configure_from_environment()
+    # Writes happen on the loop thread and reports on the executor thread, never at the same time
+    manager = FinanceManager() if options.memory else FinanceManager(SQLiteStorage(options.ledger, check_same_thread=False))
+    try:
+        asyncio.run(serve(manager, options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import sqlite3
+from array import array
+from transaction import Transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    amount INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (ordinal);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, ordinal);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    prefix_hash TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+
+COLUMNS = "amount, category, date, type, year, month, day, ordinal"
+IMPORT_COLUMNS = ('path', 'size', 'mtime_ns', 'prefix_hash', 'offset')
+
+class SQLiteStorage:
+    """Keep the ledger in an SQLite file so it survives between sessions."""
+
+    def __init__(self, path, check_same_thread=True):
+        """Open or create the ledger at path.
+
+        Pass check_same_thread=False only when the caller makes sure threads never use the connection at once.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=check_same_thread)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # Row IDs in insertion order, so a position maps to its row without an OFFSET scan
+        self._ids = array('q', (row[0] for row in self.connection.execute("SELECT id FROM transactions ORDER BY id")))
+
+    def count(self):
+        return len(self._ids)
+
+    def add_many(self, transactions):
+        """Insert transactions with a single executemany inside one transaction."""
+        rows = [(t.amount, t.category, t.date, t.transaction_type, t.year, t.month, t.day, t.ordinal) for t in transactions]
+        last_id = self._ids[-1] if self._ids else 0
+        with self.connection:
+            self.connection.executemany(f"INSERT INTO transactions ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # Read the new IDs back inside the write transaction rather than assuming they are consecutive
+            self._ids.extend(row[0] for row in self.connection.execute(
+                "SELECT id FROM transactions WHERE id > ? ORDER BY id", (last_id,)))
+
+    def fetch(self, offset, limit):
+        """Return up to limit transactions starting at the given position."""
+        if offset >= len(self._ids) or limit <= 0:
+            return []
+        rows = self.connection.execute(
+            "SELECT amount, category, date, type FROM transactions WHERE id >= ? ORDER BY id LIMIT ?", (self._ids[offset], limit))
+        return [Transaction(*row) for row in rows]
+
+    def iter_all(self, page_size=10000):
+        """Yield every transaction in insertion order, reading one page at a time."""
+        last_id = 0
+        while True:
+            rows = self.connection.execute(
+                "SELECT id, amount, category, date, type FROM transactions WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield Transaction(*row[1:])
+            last_id = rows[-1][0]
+
+    def iter_snapshot(self, page_size=10000):
+        """Yield every transaction through a connection of its own, inside one read transaction.
+
+        Safe to consume on another thread; rows added meanwhile are not seen (WAL keeps the snapshot).
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.execute("BEGIN")
+            last_id = 0
+            while True:
+                rows = connection.execute(
+                    "SELECT id, amount, category, date, type FROM transactions WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size)).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield Transaction(*row[1:])
+                last_id = rows[-1][0]
+        finally:
+            connection.close()
+
+    def iter_between(self, start, end, page_size=10000):
+        """Yield the transactions dated from start to end ordinal inclusive, in date order.
+
+        Uses the ordinal index, so only matching rows are read. Categories are filtered by the caller,
+        since rows stored in earlier sessions may spell a category differently.
+        """
+        last = (start, 0)  # row IDs start at 1
+        while True:
+            rows = self.connection.execute(
+                "SELECT ordinal, id, amount, category, date, type FROM transactions "
+                "WHERE (ordinal, id) > (?, ?) AND ordinal <= ? ORDER BY ordinal, id LIMIT ?",
+                last + (end, page_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield Transaction(*row[2:])
+            last = rows[-1][:2]
+
+    def _row_id(self, index):
+        return self._ids[index]
+
+    def replace(self, index, transaction):
+        t = transaction
+        with self.connection:
+            self.connection.execute(
+                "UPDATE transactions SET amount = ?, category = ?, date = ?, type = ?, year = ?, month = ?, day = ?, ordinal = ? WHERE id = ?",
+                (t.amount, t.category, t.date, t.transaction_type, t.year, t.month, t.day, t.ordinal, self._row_id(index)))
+
+    def delete(self, index):
+        with self.connection:
+            self.connection.execute("DELETE FROM transactions WHERE id = ?", (self._row_id(index),))
+        del self._ids[index]
+
+    def load_import_manifest(self):
+        """Return the manifest of previously imported files, keyed by absolute path."""
+        rows = self.connection.execute(f"SELECT {', '.join(IMPORT_COLUMNS)} FROM imports")
+        return {row[0]: dict(zip(IMPORT_COLUMNS, row)) for row in rows}
+
+    def save_import_entry(self, entry):
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO imports ({', '.join(IMPORT_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                tuple(entry[column] for column in IMPORT_COLUMNS))
+
+    def expense_groups(self):
+        """Sum and count expenses per (category, year, month, day) in SQL."""
+        return self.connection.execute(
+            "SELECT category, year, month, day, SUM(amount), COUNT(*) FROM transactions "
+            "WHERE type = 'expense' GROUP BY category, year, month, day")
+
+class StoredTransactions:
+    """List-like view of a storage backend so FinanceManager and the GUI can page through it."""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def __len__(self):
+        return self.storage.count()
+
+    def _position(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            transactions = self.storage.fetch(start, max(0, stop - start))
+            return transactions if step == 1 else transactions[::step]
+        return self.storage.fetch(self._position(index), 1)[0]
+
+    def __setitem__(self, index, transaction):
+        self.storage.replace(self._position(index), transaction)
+
+    def __iter__(self):
+        return self.storage.iter_all()
+
+    def append(self, transaction):
+        self.storage.add_many([transaction])
+
+    def extend(self, transactions):
+        self.storage.add_many(transactions)
+
+    def pop(self, index=-1):
+        position = self._position(index)
+        transaction = self[position]
+        self.storage.delete(position)
+        return transaction
@@ -1,6 +1,37 @@
+from operator import attrgetter
+import common_path
+from categories import registry
+from parsing import parse_date
+from streams import export_stream
+
+# Exports keep the capitalised columns and {"transactions": [...]} JSON this frontend has always written
+EXPORT_COLUMNS = ('Amount', 'Category', 'Date', 'Type')
+export_fields = attrgetter('amount', 'category', 'date', 'transaction_type')
+
+def date_periods(year, month, day):
+    """Return the day, month and year period keys of a date."""
+    return {'day': (year, month, day), 'month': (year, month), 'year': (year,)}
+
 class Transaction:
+    __slots__ = ('amount', 'category', 'category_id', 'date', 'transaction_type', 'year', 'month', 'day', 'ordinal')
+
     def __init__(self, amount, category, date, transaction_type):
-        self.amount = amount
-        self.category = category
+        self.amount = amount  # integer cents
+        # Intern the category so equal categories share one string and compare by ID
+        self.category_id = registry.intern(category)
+        self.category = registry.names[self.category_id]
         self.date = date
         self.transaction_type = transaction_type
+        # Parse the date once so reports can group on plain ints; the parse is memoized per date string
+        parsed_date = parse_date(date)
+        self.year = parsed_date.year
+        self.month = parsed_date.month
+        self.day = parsed_date.day
+        self.ordinal = parsed_date.toordinal()
+
+def export_transactions(file_path, transactions, progress=None):
+    """Stream Transactions to a CSV, JSON or JSON Lines file, compressed if the name ends in .gz or .xz.
+
+    progress, if given, is called with the size of each chunk written. Returns the number of rows written.
+    """
+    return export_stream(file_path, transactions, export_fields, EXPORT_COLUMNS, 'transactions', progress)
@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+import pytest
+
+# The frontends import their modules by bare name, so the tests run against the functional
+# tree and the shared modules on sys.path; imperative modules are loaded from their files
+# under a separate name.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'functional'))
+sys.path.append(os.path.join(ROOT, 'common'))
+
+def load_impretive(name):
+    """Load one standard-library-only module from the imperative frontend as impretive_<name>."""
+    spec = importlib.util.spec_from_file_location(f"impretive_{name}", os.path.join(ROOT, 'impretive', f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def impretive_memo():
+    return load_impretive('memo')
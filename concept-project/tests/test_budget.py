@@ -0,0 +1,28 @@
+from categories import intern_category, registry
+from budget import set_budget, track_budget_usage, track_grouped_budget_usage
+
+def transaction(amount, category, kind='expense', **extra):
+    return intern_category({'amount': amount, 'category': category, 'date': '2024-01-01', 'type': kind, **extra})
+
+LEDGER = [
+    transaction(300, 'Food', user='alice'),
+    transaction(200, ' FOOD ', user='bob'),
+    transaction(900, 'Food', 'income', user='alice'),
+    transaction(400, 'Rent', user='alice'),
+]
+
+def test_grouped_budgets_match_categories_whatever_their_spelling():
+    budgets = {'food': 1000, 'Rent': 500, 'Travel': 100}
+    assert track_grouped_budget_usage(budgets, LEDGER) == {'food': 500, 'Rent': 400, 'Travel': 0}
+    assert track_grouped_budget_usage(budgets, LEDGER) == track_budget_usage(budgets, LEDGER)
+
+def test_budgets_set_under_any_spelling_track_the_same_spending():
+    budgets = set_budget({}, 'food', 10)
+    assert dict(budgets.items()) == {'Food': 1000}
+    assert track_grouped_budget_usage(budgets, LEDGER) == {'Food': 500}
+
+def test_grouped_budgets_by_user_and_category():
+    budgets = {('alice', 'food'): 1000, ('bob', 'Food'): 100, ('bob', 'Rent'): 100}
+    usage = track_grouped_budget_usage(budgets, LEDGER, key=lambda t: (t['user'], t['category_id']),
+                                       budget_group=lambda budget: (budget[0], registry.lookup(budget[1])))
+    assert usage == {('alice', 'food'): 300, ('bob', 'Food'): 200, ('bob', 'Rent'): 0}
@@ -0,0 +1,68 @@
+import os
+from incremental import import_incremental
+
+HEADER = 'amount,category,date,type\n'
+
+def append(path, text):
+    with open(path, 'a', newline='') as file:
+        file.write(text)
+
+def run(path, manifest, ledger):
+    added, manifest, reports = import_incremental([str(path)], manifest, ledger)
+    return added, manifest, reports[0]
+
+def dates(transactions):
+    return [transaction['date'] for transaction in transactions]
+
+def test_new_file_is_read_in_full(tmp_path):
+    path = tmp_path / 'ledger.csv'
+    path.write_text(HEADER + '1,Food,2024-01-01,expense\n2,Rent,2024-01-02,expense\n')
+    added, manifest, report = run(path, {}, [])
+    assert report['status'] == 'new'
+    assert dates(added) == ['2024-01-01', '2024-01-02']
+    assert manifest[os.path.abspath(path)]['offset'] == path.stat().st_size
+
+def test_unchanged_file_is_skipped(tmp_path):
+    path = tmp_path / 'ledger.csv'
+    path.write_text(HEADER + '1,Food,2024-01-01,expense\n')
+    ledger, manifest, _ = run(path, {}, [])
+    added, _, report = run(path, manifest, ledger)
+    assert (report['status'], added) == ('unchanged', [])
+
+def test_only_appended_rows_are_parsed(tmp_path):
+    path = tmp_path / 'ledger.csv'
+    path.write_text(HEADER + '1,Food,2024-01-01,expense\n')
+    ledger, manifest, _ = run(path, {}, [])
+    append(path, '2,Rent,2024-01-02,expense\n3,Food,2024-01-03,income\n')
+    added, _, report = run(path, manifest, ledger)
+    assert report['status'] == 'appended'
+    assert dates(added) == ['2024-01-02', '2024-01-03']
+
+def test_a_row_still_being_written_waits_for_the_next_import(tmp_path):
+    path = tmp_path / 'ledger.csv'
+    path.write_text(HEADER + '1,Food,2024-01-01,expense\n2,Food,2024-01-02,expense\n3,Food,2024-01-03,expense\n')
+    ledger, manifest, _ = run(path, {}, [])
+
+    append(path, '4,Fo')
+    added, manifest, report = run(path, manifest, ledger)
+    assert added == []
+    assert report['rejected'] == 0
+
+    append(path, 'od,2024-01-04,expense\n')
+    added, manifest, report = run(path, manifest, ledger + added)
+    assert report['status'] == 'appended'
+    assert report['rejected'] == 0
+    assert [(t['amount'], t['category'], t['date']) for t in added] == [(400, 'Food', '2024-01-04')]
+
+    added, _, report = run(path, manifest, ledger + added)
+    assert (report['status'], added) == ('unchanged', [])
+
+def test_rewritten_file_skips_rows_already_in_the_ledger(tmp_path):
+    path = tmp_path / 'ledger.csv'
+    path.write_text(HEADER + '1,Food,2024-01-01,expense\n')
+    ledger, manifest, _ = run(path, {}, [])
+    path.write_text(HEADER + '9,Rent,2024-02-01,expense\n1,Food,2024-01-01,expense\n1,Food,2024-01-01,expense\n')
+    added, _, report = run(path, manifest, ledger)
+    assert report['status'] == 'rewritten'
+    # One copy was already in the ledger; the file's second copy is new
+    assert dates(added) == ['2024-02-01', '2024-01-01']
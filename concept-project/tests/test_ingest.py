@@ -0,0 +1,102 @@
+import io
+import json
+import pytest
+import parsing
+from conftest import load_impretive
+from ingest import iter_parsed, new_report, parse_text
+from parsing import DEFAULT_CHUNK_SIZE, iter_json_array, sniff_schema
+
+ROWS = [
+    (12.5, 'Food', '2024-01-05', 'expense'),
+    (1000, 'Salary', '2024-01-31', 'income'),
+    (3.99, 'Café "Bar", Ltd', '2024-2-1', 'Expense'),
+]
+EXPECTED = [(1250, 'Food', '2024-01-05', 'expense'), (100000, 'Salary', '2024-01-31', 'income'),
+            (399, 'Café "Bar", Ltd', '2024-02-01', 'expense')]
+
+def as_objects(keys):
+    return [dict(zip(keys, row)) for row in ROWS]
+
+LAYOUTS = {
+    'csv': 'Amount,Category,Date,Type\n12.5,Food,2024-01-05,expense\n1000,Salary,2024-01-31,income\n'
+           '3.99,"Café ""Bar"", Ltd",2024-2-1,Expense\n',
+    'json-array': json.dumps(as_objects(('amount', 'category', 'date', 'type')), ensure_ascii=False),
+    'json-wrapped': json.dumps({'Transactions': as_objects(('Amount', 'Category', 'Date', 'Type'))}, indent=2, ensure_ascii=False),
+    'jsonl': '\n'.join(json.dumps(record) for record in as_objects(('amount', 'category', 'date', 'transaction_type'))) + '\n',
+}
+
+def fields(transactions):
+    return [(t['amount'], t['category'], t['date'], t['type']) for t in transactions]
+
+def parse(text, chunk_size=DEFAULT_CHUNK_SIZE):
+    report = new_report()
+    return fields(iter_parsed(io.StringIO(text), report, chunk_size)), report
+
+@pytest.mark.parametrize('schema', sorted(LAYOUTS))
+def test_sniffs_each_layout(schema):
+    assert sniff_schema(LAYOUTS[schema]) == schema
+
+def test_sniffs_a_single_line_wrapped_object_and_leading_whitespace():
+    assert sniff_schema('{"transactions": []}') == 'json-wrapped'
+    assert sniff_schema('\n  [{"amount": 1}]') == 'json-array'
+
+@pytest.mark.parametrize('schema', sorted(LAYOUTS))
+def test_parses_each_layout_to_the_same_transactions(schema):
+    transactions, report = parse(LAYOUTS[schema])
+    assert transactions == EXPECTED
+    assert report['schema'] == schema
+    assert (report['rows'], report['rejected']) == (3, 0)
+
+@pytest.mark.parametrize('schema', sorted(LAYOUTS))
+def test_the_imperative_frontend_reads_the_same_rows(schema):
+    impretive_ingest = load_impretive('ingest')
+    report = impretive_ingest.ImportReport()
+    rows = list(impretive_ingest.iter_parsed_rows(io.StringIO(LAYOUTS[schema] + 'not a row\n'), report))
+    assert rows[:3] == EXPECTED
+    assert (report.schema, report.rows - report.rejected) == (schema, len(rows))
+
+def test_skips_a_byte_order_mark():
+    assert parse('﻿' + LAYOUTS['json-array'])[0] == EXPECTED
+
+@pytest.mark.parametrize('schema', sorted(LAYOUTS))
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 13, 64])
+def test_chunk_boundaries_do_not_change_the_result(schema, chunk_size):
+    assert parse(LAYOUTS[schema], chunk_size) == parse(LAYOUTS[schema])
+
+def test_a_number_cut_by_a_chunk_boundary_is_read_whole():
+    text = '[{"amount": 1, "category": "Food", "date": "2024-01-01", "type": "expense"}, 123.45]'
+    cut = text.index('123') + 2
+    values = list(iter_json_array(io.StringIO(text[cut:]), chunk_size=4, buffer=text[:cut]))
+    assert values[1] == 123.45
+
+def test_malformed_elements_are_recorded_and_skipped():
+    good = json.dumps(as_objects(('amount', 'category', 'date', 'type'))[0])
+    text = '[' + ','.join([good, '{"amount": 1 "category": "x"}', 'tru', good, '{"a": [1, 2}}', good]) + ']'
+    for chunk_size in (1, 7, 4096):
+        transactions, report = parse(text, chunk_size)
+        assert transactions == [EXPECTED[0]] * 3
+        assert (report['rows'], report['rejected']) == (6, 3)
+        assert [error['row'] for error in report['errors']] == [2, 3, 5]
+        assert report['errors'][0]['record'] == '{"amount": 1 "category": "x"}'
+
+def test_invalid_rows_are_recorded_with_their_line_number():
+    text = 'amount,category,date,type\n1,Food,2024-01-01,expense\nabc,Food,2024-01-01,expense\n2,,2024-01-01,expense\n'
+    transactions, report = parse(text)
+    assert len(transactions) == 1
+    assert [(error['row'], error['error']) for error in report['errors']] == [
+        (3, "Invalid amount: 'abc'"), (4, 'missing category')]
+
+def test_an_unterminated_array_fails():
+    with pytest.raises(json.JSONDecodeError):
+        parse('[{"amount": 1, "category": "Food"', chunk_size=8)
+
+def test_an_element_that_never_ends_fails_without_reading_the_rest(monkeypatch):
+    monkeypatch.setattr(parsing, 'MAX_ELEMENT_SIZE', 1000)
+    text = '[{"amount": [' + '1, ' * 100_000 + ']'
+    stream = io.StringIO(text)
+    with pytest.raises(json.JSONDecodeError, match='too long'):
+        list(iter_parsed(stream, new_report(), chunk_size=64))
+    assert stream.tell() < 2000
+
+def test_parse_text_reads_a_whole_document():
+    assert fields(parse_text(LAYOUTS['jsonl'], new_report())) == EXPECTED
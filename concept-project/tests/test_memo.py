@@ -0,0 +1,108 @@
+import pytest
+import memo
+from memo import cached_call
+from persistent import PersistentVector
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    memo.configure(memo.DEFAULT_MAX_ENTRIES)
+    memo.clear()
+    memo.reset_stats()
+    yield
+    memo.configure(memo.DEFAULT_MAX_ENTRIES)
+    memo.clear()
+
+def counting(function):
+    def wrapper(*args):
+        wrapper.calls += 1
+        return function(*args)
+    wrapper.calls = 0
+    return wrapper
+
+def test_reuses_a_result_for_the_same_ledger_version():
+    total = counting(lambda transactions: sum(transactions))
+    ledger = PersistentVector([1, 2, 3])
+    assert cached_call(total, ledger) == 6
+    assert cached_call(total, ledger) == 6
+    assert total.calls == 1
+    assert memo.stats()['hits'] == 1
+
+def test_a_new_ledger_version_invalidates_the_result():
+    total = counting(lambda transactions: sum(transactions))
+    ledger = PersistentVector([1, 2, 3])
+    cached_call(total, ledger)
+    updated = ledger.extend([4])
+    assert cached_call(total, updated) == 10
+    assert total.calls == 2
+    assert memo.stats()['invalidations'] == 1
+    assert memo.stats()['entries'] == 1
+    # An equal but separate value is still a different version
+    assert cached_call(total, PersistentVector([1, 2, 3, 4])) == 10
+    assert total.calls == 3
+
+def test_an_explicit_version_invalidates_the_result():
+    rows = [1, 2]
+    total = counting(lambda: sum(rows))
+    version = object()
+    assert cached_call(total, version=version) == 3
+    rows.append(3)
+    assert cached_call(total, version=version) == 3
+    assert cached_call(total, version=object()) == 6
+    assert total.calls == 2
+
+def test_hashable_arguments_are_matched_by_value():
+    scale = counting(lambda transactions, factor: sum(transactions) * factor)
+    ledger = PersistentVector([1, 2])
+    assert cached_call(scale, ledger, 2) == 6
+    assert cached_call(scale, ledger, 3) == 9
+    assert cached_call(scale, ledger, 2) == 6
+    assert scale.calls == 2
+
+def test_least_recently_used_results_are_evicted():
+    memo.configure(2)
+    square = counting(lambda n: n * n)
+    for n in (1, 2, 1, 3):
+        cached_call(square, n)
+    cached_call(square, 1)
+    cached_call(square, 2)
+    assert square.calls == 4
+    assert memo.stats()['evictions'] == 2
+
+def test_a_size_of_zero_turns_caching_off():
+    memo.configure(0)
+    square = counting(lambda n: n * n)
+    cached_call(square, 4)
+    cached_call(square, 4)
+    assert square.calls == 2
+    assert memo.stats()['entries'] == 0
+
+class Manager:
+    """Stands in for FinanceManager: a version bumped on every change and a result cache."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.version = 0
+        self.rows = []
+        self.calls = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        self.version += 1
+
+def test_result_cache_recomputes_after_the_manager_version_changes(impretive_memo):
+    class Reports(Manager):
+        @impretive_memo.memoized
+        def total(self, scale=1):
+            self.calls += 1
+            return sum(self.rows) * scale
+
+    manager = Reports(impretive_memo.ResultCache(max_entries=4))
+    manager.add(5)
+    assert manager.total() == 5
+    assert manager.total() == 5
+    assert manager.total(scale=2) == 10
+    manager.add(7)
+    assert manager.total() == 12
+    assert manager.calls == 3
+    stats = manager.cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (1, 3, 1)
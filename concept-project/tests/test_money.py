@@ -0,0 +1,46 @@
+from decimal import Decimal
+import pytest
+from money import format_cents, from_cents, to_cents
+
+@pytest.mark.parametrize('amount, cents', [
+    (12, 1200),
+    (-3, -300),
+    (12.5, 1250),
+    (0.1 + 0.2, 30),
+    (19.99, 1999),
+    ('12', 1200),
+    ('12.3', 1230),
+    ('12.34', 1234),
+    (' 7.05 ', 705),
+    ('+5', 500),
+    ('-0.5', -50),
+    ('1e3', 100000),
+    (Decimal('2.50'), 250),
+])
+def test_converts_amounts_to_cents(amount, cents):
+    assert to_cents(amount) == cents
+
+@pytest.mark.parametrize('amount, cents', [
+    ('1.005', 101),
+    ('-1.005', -101),
+    ('0.125', 13),
+    ('2.675', 268),
+    (2.675, 268),  # stored as 2.67499999..., but written with three decimals
+    (1.005, 101),
+    ('1.0049', 100),
+])
+def test_rounds_half_away_from_zero(amount, cents):
+    assert to_cents(amount) == cents
+
+@pytest.mark.parametrize('amount', ['', 'abc', '1.2.3', '12,50', '$5', 'nan', 'inf', float('nan'), float('inf')])
+def test_rejects_what_is_not_an_amount(amount):
+    with pytest.raises(ValueError, match='Invalid amount'):
+        to_cents(amount)
+
+def test_rejects_other_types():
+    with pytest.raises(TypeError):
+        to_cents(None)
+
+def test_formats_cents():
+    assert [format_cents(cents) for cents in (0, 5, 1234, -1234, -5)] == ['0.00', '0.05', '12.34', '-12.34', '-0.05']
+    assert from_cents(1234) == 12.34
@@ -0,0 +1,77 @@
+import pytest
+from persistent import PersistentMap, PersistentVector
+
+# Sizes either side of a full leaf (32), a full root of leaves (1024) and a third level
+BOUNDARIES = [0, 1, 31, 32, 33, 63, 64, 65, 1023, 1024, 1025, 1056, 1057, 32 * 1024 + 1]
+
+class CollidingKey:
+    """A key whose hash is fixed, so distinct keys land in the same bucket."""
+
+    def __init__(self, name, key_hash=7):
+        self.name, self.key_hash = name, key_hash
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+@pytest.mark.parametrize('size', BOUNDARIES)
+def test_vector_indexes_every_item_across_trie_boundaries(size):
+    vector = PersistentVector(range(size))
+    assert len(vector) == size
+    assert list(vector) == list(range(size))
+    assert [vector[index] for index in range(size)] == list(range(size))
+    if size:
+        assert vector[-1] == size - 1
+    with pytest.raises(IndexError):
+        vector[size]
+
+@pytest.mark.parametrize('size', BOUNDARIES)
+def test_append_and_extend_match_building_at_once(size):
+    appended = PersistentVector()
+    for item in range(size):
+        appended = appended.append(item)
+    assert list(appended) == list(range(size))
+    # Starting from a part-filled tail makes every extended chunk straddle a leaf
+    extended = PersistentVector(range(5)).extend(range(5, size))
+    assert list(extended) == list(range(max(size, 5)))
+    assert extended[size - 1 if size > 5 else 4] == max(size, 5) - 1
+
+def test_older_versions_are_unchanged():
+    before = PersistentVector(range(1024))
+    after = before.extend(range(1024, 1100)).append('last')
+    assert len(before) == 1024 and list(before) == list(range(1024))
+    assert len(after) == 1101 and after[1024] == 1024 and after[-1] == 'last'
+    assert before.extend([]) is before
+
+@pytest.mark.parametrize('bounds', [
+    slice(None), slice(0, 32), slice(31, 33), slice(30, 1030), slice(1000, None),
+    slice(-40, -3), slice(5, 5), slice(10, 2), slice(None, None, 7), slice(None, None, -1), slice(1030, 20, -33),
+])
+def test_slices_match_a_list(bounds):
+    items = list(range(1057))
+    assert PersistentVector(items)[bounds] == items[bounds]
+
+def test_map_keeps_values_and_insertion_order_across_levels():
+    # Integers hash to themselves, so these keys share their low 5 and then 10 bits
+    keys = [0, 32, 1024, 32 * 1024, 1, 33]
+    mapping = PersistentMap((key, str(key)) for key in keys)
+    assert list(mapping) == keys
+    assert [mapping[key] for key in keys] == [str(key) for key in keys]
+    updated = mapping.set(1024, 'changed').set(2, 'new')
+    assert updated[1024] == 'changed' and list(updated) == keys + [2]
+    assert mapping[1024] == '1024' and 2 not in mapping
+    with pytest.raises(KeyError):
+        mapping[64]
+
+def test_map_keeps_keys_whose_hashes_collide():
+    first, second, third = CollidingKey('a'), CollidingKey('b'), CollidingKey('c')
+    mapping = PersistentMap([(first, 1), (second, 2)]).set(CollidingKey('d', 7 + 1024), 4)
+    assert mapping[first] == 1 and mapping[second] == 2 and mapping[CollidingKey('d', 7 + 1024)] == 4
+    assert len(mapping) == 3
+    replaced = mapping.set(CollidingKey('b'), 20)
+    assert replaced[second] == 20 and mapping[second] == 2 and len(replaced) == 3
+    assert third not in replaced
+    with pytest.raises(KeyError):
+        replaced[third]
@@ -0,0 +1,42 @@
+import sqlite3
+from categories import intern_category
+from rollup import build_rollup, compare_periods, latest_period, period_summary, update_rollup
+from storage import SCHEMA, load_rollup, save_transactions
+
+def transaction(amount, category, date, kind='expense'):
+    return intern_category({'amount': amount, 'category': category, 'date': date, 'type': kind})
+
+LEDGER = [
+    transaction(500, 'Rent', '2023-12-31'),
+    transaction(300, 'Food', '2024-01-02'),
+    transaction(900, 'Salary', '2024-01-03', 'income'),
+    transaction(200, 'Rent', '2024-01-05'),
+    transaction(100, 'food', '2024-01-05'),
+]
+
+def test_summarises_every_granularity_without_income():
+    rollup = build_rollup(LEDGER)
+    assert period_summary(rollup, 'day', (2024, 1, 5)) == {'Rent': 200, 'Food': 100}
+    assert period_summary(rollup, 'month', (2024, 1)) == {'Food': 400, 'Rent': 200}
+    assert period_summary(rollup, 'year', (2023,)) == {'Rent': 500}
+    assert latest_period(rollup, 'month') == (2024, 1)
+
+def test_compares_periods_across_a_year_boundary():
+    rollup = build_rollup(LEDGER)
+    assert compare_periods(rollup, 'month', (2024, 1), (2023, 12)) == {'Food': 400, 'Rent': -300}
+
+def test_updates_match_a_rebuild():
+    rollup = build_rollup(LEDGER[:2])
+    for added in LEDGER[2:]:
+        update_rollup(rollup, added)
+    assert rollup == build_rollup(LEDGER)
+
+def test_sql_rollup_matches_one_built_from_the_rows():
+    connection = sqlite3.connect(':memory:')
+    connection.executescript(SCHEMA)
+    save_transactions(connection, LEDGER)
+    assert load_rollup(connection) == build_rollup(LEDGER)
+    assert list(period_summary(load_rollup(connection), 'month', (2024, 1))) == ['Food', 'Rent']
+
+def test_an_empty_rollup_has_no_latest_period():
+    assert latest_period(build_rollup([]), 'month') is None
@@ -0,0 +1,38 @@
+import gzip
+import json
+from operator import itemgetter
+import pytest
+from streams import export_stream, open_text, text_format
+
+ROWS = [(150, 'Food', '2024-01-01', 'expense'), (-5, 'Refund', '2024-01-02', 'income')]
+as_tuple = itemgetter(0, 1, 2, 3)
+
+def test_names_the_format_under_a_compression_suffix():
+    assert [text_format(name) for name in ('a.csv', 'a.jsonl.gz', 'a.json.xz', 'a.txt')] == ['.csv', '.jsonl', '.json', '']
+
+@pytest.mark.parametrize('name', ['out.csv', 'out.json', 'out.jsonl', 'out.csv.gz', 'out.json.xz'])
+def test_writes_every_row_whatever_the_format(tmp_path, name):
+    chunks = []
+    assert export_stream(str(tmp_path / name), ROWS, as_tuple, progress=chunks.append) == 2
+    assert chunks == [2]
+    with open_text(str(tmp_path / name)) as file:
+        text = file.read()
+    assert '1.50' in text or '1.5' in text
+    assert 'Refund' in text
+
+def test_names_columns_and_wraps_json_as_asked(tmp_path):
+    path = str(tmp_path / 'out.json')
+    export_stream(path, ROWS[:1], as_tuple, ('Amount', 'Category', 'Date', 'Type'), 'transactions')
+    assert json.load(open(path)) == {'transactions': [{'Amount': 1.5, 'Category': 'Food', 'Date': '2024-01-01', 'Type': 'expense'}]}
+
+def test_an_empty_export_is_still_a_valid_document(tmp_path):
+    export_stream(str(tmp_path / 'a.json'), [], as_tuple)
+    export_stream(str(tmp_path / 'b.json.gz'), [], as_tuple, json_key='transactions')
+    export_stream(str(tmp_path / 'c.csv'), [], as_tuple)
+    assert json.load(open(tmp_path / 'a.json')) == []
+    assert json.load(gzip.open(tmp_path / 'b.json.gz', 'rt')) == {'transactions': []}
+    assert (tmp_path / 'c.csv').read_bytes() == b'amount,category,date,type\r\n'
+
+def test_rejects_other_formats(tmp_path):
+    with pytest.raises(ValueError):
+        export_stream(str(tmp_path / 'out.txt'), ROWS, as_tuple)